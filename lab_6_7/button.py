@@ -1,4 +1,6 @@
 import pygame
+from fonts import render_text
+from inputs import frame_input
 
 class Button:
 
@@ -20,8 +22,9 @@ class Button:
     def render(self, screen: pygame.Surface):
         """ Blits button image onto given surface
         :param screen: pygame.Surface to render button on
+        :returns: pygame.Rect of the affected area
         """
-        screen.blit(self.text_surface, self.text_rect)
+        return screen.blit(self.text_surface, self.text_rect)
     
     def update_text(self, text=""):
         """ Redraws button with new fontsize and (optionaly) text
@@ -29,13 +32,12 @@ class Button:
         """
         if text:
             self.text = text
-        self.font = pygame.font.Font(Button.FONT_NAME, int(self.fontsize))
-        self.text_surface = self.font.render(self.text, True, Button.COLOR)
+        self.text_surface = render_text(Button.FONT_NAME, int(self.fontsize), self.text, Button.COLOR)
         self.text_rect = self.text_surface.get_rect(center = self.center)
 
     def progress(self):
         """ Animates button """
-        if self.is_mouse_on(pygame.mouse.get_pos()):
+        if self.is_mouse_on(frame_input.get_mouse_pos()):
             self.fontsize += Button.ANIMATION_SPEED
         else:
             self.fontsize -= Button.ANIMATION_SPEED
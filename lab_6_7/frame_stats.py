@@ -0,0 +1,143 @@
+from time import perf_counter
+import sys
+import numpy as np
+from fonts import render_text
+
+"""
+Implements collection of per-frame timings and their on-screen overlay
+
+Classes:
+
+    FrameStats
+    StatsOverlay
+
+"""
+
+class FrameStats:
+    """ Timings of the last frames kept in a ring buffer
+
+    Functions of the game phases are wrapped to add their duration to the current
+    frame, see wrap(). end_frame() stores the current frame and starts a new one.
+    Nothing is measured unless the wrapped functions are installed, so disabled
+    statistics cost nothing
+    """
+    SIZE = 4096
+    PERCENTILES = (50, 95, 99)
+    HISTOGRAM_BINS = 20
+    HISTOGRAM_WIDTH = 50
+
+    def __init__(self, phases, size=SIZE):
+        """ Initializes empty buffer
+        :param phases: Names of the measured phases of a frame
+        :param size: (option) Number of the last frames kept
+        """
+        self.phases = list(phases)
+        # Columns are the phases and the whole frame, in seconds
+        self.timings = np.zeros((size, len(self.phases) + 1))
+        self.current = [0.0] * len(self.phases)
+        # Number of frames recorded so far, including the overwritten ones
+        self.frames = 0
+
+    def wrap(self, phase, function):
+        """ Returns function which calls the given one and adds its duration to the phase
+        :param phase: Name of the phase
+        :param function: Measured function
+        """
+        i = self.phases.index(phase)
+        current = self.current
+
+        def timed(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                current[i] += perf_counter() - start
+
+        return timed
+
+    def end_frame(self, frame_time):
+        """ Stores the current frame
+        :param frame_time: Duration of the whole frame in seconds
+        """
+        row = self.timings[self.frames % len(self.timings)]
+        row[:-1] = self.current
+        row[-1] = frame_time
+        for i in range(len(self.current)):
+            self.current[i] = 0.0
+        self.frames += 1
+
+    def recorded(self):
+        """ :returns: Array of shape (frames kept, phases + 1) with timings of the recorded frames """
+        return self.timings[:min(self.frames, len(self.timings))]
+
+    def percentiles(self):
+        """ :returns: Array of shape (len(PERCENTILES), phases + 1) with timing percentiles in seconds """
+        return np.percentile(self.recorded(), FrameStats.PERCENTILES, axis=0)
+
+    def dump(self, file=sys.stdout):
+        """ Prints timing percentiles and the histogram of the frame times
+        :param file: (option) Text file to print to
+        """
+        frames = self.recorded()
+        if not len(frames):
+            return
+        print(f"Frame times of the last {len(frames)} frames, ms", file=file)
+        header = "".join(f"{f'p{q}':>10}" for q in FrameStats.PERCENTILES)
+        print(f"{'':>10}{header}", file=file)
+        for name, column in zip(self.phases + ["frame"], self.percentiles().T * 1000):
+            print(f"{name:>10}" + "".join(f"{value:10.2f}" for value in column), file=file)
+
+        counts, edges = np.histogram(frames[:, -1] * 1000, FrameStats.HISTOGRAM_BINS)
+        scale = FrameStats.HISTOGRAM_WIDTH / counts.max()
+        for count, low, high in zip(counts, edges, edges[1:]):
+            print(f"{low:7.2f} - {high:7.2f} {'#' * int(count * scale):<{FrameStats.HISTOGRAM_WIDTH}} {count}", file=file)
+
+class StatsOverlay:
+    """ Text block with frame time percentiles and object counts drawn over the game """
+    # Frames between updates of the text
+    REFRESH = 15
+
+    def __init__(self, font_name, font_size, color, topleft):
+        """ Initializes the overlay
+        :param font_name: Font file name
+        :param font_size: Font size
+        :param color: (R, G, B) text color
+        :param topleft: Position (x, y) of the top left corner
+        """
+        self.font_name = font_name
+        self.font_size = font_size
+        self.color = color
+        self.topleft = topleft
+        self.lines = []
+        self.updated = None
+
+    def update(self, stats, counts):
+        """ Recomputes the text
+        :param stats: FrameStats to be shown
+        :param counts: Dictionary object name -> number of objects
+        """
+        self.updated = stats.frames
+        self.lines = []
+        if stats.frames:
+            labels = [f"p{q}" for q in FrameStats.PERCENTILES]
+            for name, column in zip(stats.phases + ["frame"], stats.percentiles().T * 1000):
+                values = " ".join(f"{label} {value:.1f}" for label, value in zip(labels, column))
+                self.lines.append(f"{name}: {values} ms")
+        self.lines += [f"{name}: {number}" for name, number in counts.items()]
+
+    def render(self, screen, stats, counts):
+        """ Draws the overlay, the text is updated every REFRESH frames
+        :param screen: pygame.Surface to draw on
+        :param stats: FrameStats to be shown
+        :param counts: Dictionary object name -> number of objects
+        :returns: List of pygame.Rect areas drawn
+        """
+        if self.updated is None or stats.frames - self.updated >= StatsOverlay.REFRESH:
+            self.update(stats, counts)
+        x, y = self.topleft
+        dirty = []
+        for line in self.lines:
+            text_surface = render_text(self.font_name, self.font_size, line, self.color)
+            dirty.append(screen.blit(text_surface, (x, y)))
+            y += text_surface.get_height()
+        return dirty
@@ -0,0 +1,59 @@
+import pygame
+
+"""
+Implements polled user input shared by the game elements
+
+Classes:
+
+    KeyState
+    FrameInput
+
+Constants:
+
+    frame_input
+
+"""
+
+class KeyState:
+    """ Set of pressed keys indexable like pygame.key.get_pressed() """
+
+    def __init__(self, pressed=()):
+        """ :param pressed: Iterable of pygame key constants which are held down """
+        self.pressed = set(pressed)
+
+    def __getitem__(self, key):
+        return key in self.pressed
+
+class FrameInput:
+    """ Mouse and keyboard state held fixed during a frame
+
+    main() captures it from pygame once per frame, replay sets it from a recording instead
+    """
+
+    def __init__(self):
+        self.mouse_pos = (0, 0)
+        self.keys = KeyState()
+
+    def get_mouse_pos(self):
+        """ :returns: Mouse position (x, y) of the current frame """
+        return self.mouse_pos
+
+    def get_pressed(self):
+        """ :returns: Pressed keys of the current frame """
+        return self.keys
+
+    def capture(self):
+        """ Reads mouse and keyboard state from pygame """
+        self.mouse_pos = pygame.mouse.get_pos()
+        self.keys = pygame.key.get_pressed()
+
+    def set(self, mouse_pos, keys):
+        """ Sets state of the frame
+        :param mouse_pos: Mouse position (x, y)
+        :param keys: Pressed keys, indexable by pygame key constants
+        """
+        self.mouse_pos = mouse_pos
+        self.keys = keys
+
+# Polled input of the game, shared by the buttons
+frame_input = FrameInput()
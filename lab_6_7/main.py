@@ -1,98 +1,180 @@
+from functools import cached_property
+import os
+import sys
+from time import perf_counter
 import pygame
 from pygame.draw import *
 from random import randint, random
 from math import pi, cos, sin
 from button import *
-from targets import Ball, Triangle
+import fonts
+from targets import BallSwarm, Triangle
+from inputs import frame_input
+from scores import ScoreStore
+from profiles import DifficultyProfile, load_profiles
+from frame_stats import FrameStats, StatsOverlay
+import rng
 import json
+import numpy as np
 
 FPS = 60
+# Simulation runs with fixed ticks, independently of the refresh rate
+TICK_RATE = 60
+TICK_TIME = 1 / TICK_RATE
+# Maximal number of ticks per frame, slower frames make the game slow down instead of stalling
+MAX_CATCH_UP_TICKS = 5
 WIDTH, HEIGHT = 1200, 900
 MARGIN = 100
 
+# Only redraw screen areas touched during the current and the previous frame
+DIRTY_RECTS = True
+# Events after which the whole window has to be repainted
+EXPOSE_EVENTS = (pygame.WINDOWEXPOSED, pygame.VIDEOEXPOSE)
+
+# Key toggling frame timing statistics and their overlay
+STATS_KEY = pygame.K_F3
+STATS_FONTSIZE = 20
+# Key starting and stopping profile capture, see capture.py
+PROFILE_KEY = pygame.K_F4
+
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
+TRANSPARENT = (0, 0, 0, 0)
 
 FONT_NAME = "JetBrainsMono"
 
 class Config:
 
-    def __init__(self):
-        """ Initializes config with data from config.json file and sets GameSession parameters """
-        self.data = json.load(open("config.json"))
-        GameSession.N = self.data["GameSession"]["N"]
-        GameSession.M = self.data["GameSession"]["M"]
-        GameSession.T = self.data["GameSession"]["Session_Time"]
+    PATH = "config.json"
 
-    def set_difficulty(self, difficulty):
-        """ Sets new difficulty
-        :param difficulty: New difficulty value, one of the 
-             {Game.SOFTCORE, Game.MEDIUMCORE, Game.HARDCORE}
+    def __init__(self, path=PATH):
+        """ Loads difficulty profiles from the config file
+        :param path: (option) Path of the config file
         """
-        Ball.MAX_V = self.data["Ball"]["MAX_V"][difficulty]
-        Ball.MIN_R = self.data["Ball"]["MIN_R"][difficulty]
-        Ball.MAX_R = self.data["Ball"]["MAX_R"][difficulty]
-        Ball.MAX_V = self.data["Ball"]["MAX_V"][difficulty]
-        Ball.DIFFICULTY_SCORE_FACTOR = self.data["Ball"]["DIFFICULTY_SCORE_FACTOR"][difficulty]
+        self.path = path
+        self.mtime = None
+        self.profiles = {}
+        self.reload()
 
-        Triangle.DIFFICULTY_SCORE_FACTOR = self.data["Triangle"]["DIFFICULTY_SCORE_FACTOR"][difficulty]
-        Triangle.v = self.data["Triangle"]["v"][difficulty]
-        Triangle.v_phi = self.data["Triangle"]["v_phi"][difficulty]
+    def reload(self):
+        """ Reloads profiles if the config file was modified since the last load
+        An invalid file is reported and the previous profiles are kept
+
+        :returns: True if the profiles were replaced, False otherwise
+        """
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+            if mtime == self.mtime:
+                return False
+            self.mtime = mtime
+            profiles = load_profiles(self.path)
+            missing = set(Menu.DIFFICULTIES) - profiles.keys()
+            if missing:
+                raise ValueError(f"{self.path} misses difficulties {sorted(missing)}")
+        except (OSError, ValueError) as error:
+            if not self.profiles:
+                raise
+            print(f"Config is not reloaded: {error}", file=sys.stderr)
+            return False
+        self.profiles = profiles
+        return True
 
 class Leaderboard:
 
-    def __init__(self):
-        """ Initializes leaderboard with data from leaderboard.json file """
-        self.data = json.load(open("leaderboard.json"))
-        self.data = sorted(self.data, key = lambda a: -int(a[0]))
+    FONTSIZE = 47
+    PATH = "leaderboard.db"
+    # Results of the older versions, imported into an empty leaderboard
+    LEGACY_PATH = "leaderboard.json"
+    # Number of the displayed results
+    SIZE = 5
+
+    def __init__(self, path=PATH, size=SIZE):
+        """ Initializes leaderboard with data from the database
+        :param path: (option) Path of the database file, see scores.ScoreStore
+        :param size: (option) Number of the displayed results
+        """
+        self.store = ScoreStore(path, size)
+        if not self.store.best() and os.path.exists(Leaderboard.LEGACY_PATH):
+            with open(Leaderboard.LEGACY_PATH) as file:
+                self.store.add_many((name.rstrip(), int(score)) for score, name in json.load(file))
 
-    
-    def save(self):
-        """ Saves data to leaderboard.json file """
-        json.dump(self.data, open("leaderboard.json", "w"), indent = 4)
+    def close(self):
+        """ Closes the database, all results are already saved """
+        self.store.close()
 
     def add(self, name, score):
         """ Adds new result to leaderboard
         :param name: Player name
         :param score: Player result
         """
-        # Makes sure that names and the score have fixed lengths 
-        while len(name) < 15:
-            name += " "
-        score = str(score)
-        while(len(score) < 4):
-            score = " " + score
-        # Sortes leaderboard and keeps only top 5 results
-        self.data = sorted(self.data + [(score, name)], key = lambda a: -int(a[0]))
-        self.data = self.data[:-1]
+        self.store.add(name, score)
     
-    def render(self):
+    def render(self, screen, top=0):
+        """ Blits leaderboard lines onto the surface
+        :param screen: pygame.Surface to render on
+        :param top: Vertical offset of the leaderboard
+        :returns: List of pygame.Rect areas affected
         """
-        :returns: pygame.Surface with leaderboard rendered on it """
-        screen = pygame.Surface((WIDTH, HEIGHT * 0.8), pygame.SRCALPHA)
-        font = pygame.font.Font(FONT_NAME, 47)
+        dirty = []
         text = ["Leaderboard"]
-        for i in range(5):
-            text += [f"{i + 1} {self.data[i][1]} {self.data[i][0]}"]
-        for i in range(6):
-            line = text[i]
-            text_surface = font.render(line, True, BLACK)
-            text_rect = text_surface.get_rect(center = (WIDTH // 2, HEIGHT * (i + 1) * 0.09))
-            screen.blit(text_surface, text_rect)
-        return screen
+        for i, (score, name) in enumerate(self.store.best()):
+            # Names and the scores have fixed lengths
+            text += [f"{i + 1} {name:<15} {score:>4}"]
+        for i, line in enumerate(text):
+            text_surface = fonts.render_text(FONT_NAME, Leaderboard.FONTSIZE, line, BLACK)
+            text_rect = text_surface.get_rect(center = (WIDTH // 2, top + HEIGHT * (i + 1) * 0.09))
+            dirty.append(screen.blit(text_surface, text_rect))
+        return dirty
 
 class GameSession:
 
-    N, M = 5, 2
-    T = 2 * FPS
+    FONTSIZE = 30
     
-    def __init__(self):
-        """ Initializes game session with targets, resets score and time """
-        self.balls = [Ball() for _ in range(GameSession.N)]
-        self.triangles = [Triangle() for _ in range(GameSession.M)]
+    def __init__(self, profile=DifficultyProfile()):
+        """ Initializes game session with targets, resets score and time
+        :param profile: (option) DifficultyProfile of the session
+        """
+        self.profile = profile
+        self.balls = BallSwarm(profile.N, profile.ball)
+        self.triangles = [Triangle(profile.triangle) for _ in range(profile.M)]
         self.score = 0
-        self.time = self.T
-        self.font = pygame.font.Font(FONT_NAME,  30)
+        self.time = profile.T
+
+    def hit_test(self, positions):
+        """
+        Finds targets hit by each of the clicks
+
+        :param positions: Array of shape (k, 2) with click positions (x, y)
+        :returns: Pair of boolean arrays of shapes (k, balls number) and (k, triangles number)
+        """
+        return self.balls.clicked(positions), Triangle.clicked(self.triangles, positions)
+
+    def handle_clicks(self, positions):
+        """
+        Handles a batch of mouse clicks in order
+        Clicked targets should disapper, each target is scored only once
+
+        :param positions: List of click positions (x, y)
+        """
+        positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+        ball_hits, triangle_hits = self.hit_test(positions)
+        for ball_hit, triangle_hit in zip(ball_hits, triangle_hits):
+            ball_hit &= self.balls.t > 0
+            hit = int(np.count_nonzero(ball_hit))
+            if hit:
+                self.score += int(self.balls.get_scores(ball_hit).sum())
+                self.balls.terminate(ball_hit)
+            for i in np.flatnonzero(triangle_hit):
+                triangle = self.triangles[i]
+                if not triangle.is_dead():
+                    self.score += triangle.get_score()
+                    triangle.terminate()
+                    hit += 1
+
+            # Punishing for misses
+            if not hit:
+                self.score -= 3
+                self.score = max(self.score, 0)
 
     def handle_click(self, pos):
         """
@@ -101,52 +183,39 @@ class GameSession:
 
         :param pos: Position (x, y) of mouse click
         """
-        hit = 0
-        for target in self.balls + self.triangles:
-            if target.is_clicked(pos):
-                self.score += target.get_score()
-                target.terminate()
-                hit += 1
-
-        # Punishing for misses
-        if not hit:
-            self.score -= 3
-            self.score = max(self.score, 0)
+        self.handle_clicks([pos])
 
     def progress(self):
         """ Moves targets, handles colissions and creates new targets """
         self.time -= 1
 
-        for target in self.balls + self.triangles:
-            target.move()
-        
-        for ball in self.balls:
-            collision_type = ball.check_collision()
-            if collision_type != (Ball.COLLISION_NONE, Ball.COLLISION_NONE):
-                ball.generate_velocity(*collision_type)
+        self.balls.progress()
+
         for triangle in self.triangles:
+            triangle.move()
             if triangle.check_collision():
                 triangle.terminate()
+            triangle.reduce_life_clock()
+            if triangle.is_dead():
+                triangle.reset()
 
-        for target in self.balls + self.triangles:
-            target.reduce_life_clock()
-            if target.is_dead():
-                target.reset()
-
-    def render(self, screen, render_text=True, transparency_factor=1):
+    def render(self, screen, render_text=True, transparency_factor=1, alpha=1):
         """ Renders all targets, the score and the timer
         :param screen: PyGame screen to render on
         :param render_text: True if requested to render score and timer
         :pararm transparency_factor: Multiplies transparency
+        :param alpha: Fraction of the simulation tick elapsed since the last progress()
+        :returns: List of pygame.Rect areas affected
         """       
-        for target in self.balls + self.triangles:
-            target.render(screen, transparency_factor)
+        dirty = self.balls.render(screen, transparency_factor, alpha)
+        dirty += [triangle.render(screen, transparency_factor, alpha) for triangle in self.triangles]
 
         if render_text:
-            score_surface = self.font.render(f"Score := {self.score}", True, BLACK)
-            timer_surface = self.font.render(f"Time left := {self.time // FPS}", True, BLACK)
-            screen.blit(score_surface, (30, 10))
-            screen.blit(timer_surface, (30, 50))
+            score_surface = fonts.render_text(FONT_NAME, GameSession.FONTSIZE, f"Score := {self.score}", BLACK)
+            timer_surface = fonts.render_text(FONT_NAME, GameSession.FONTSIZE, f"Time left := {self.time // TICK_RATE}", BLACK)
+            dirty.append(screen.blit(score_surface, (30, 10)))
+            dirty.append(screen.blit(timer_surface, (30, 50)))
+        return dirty
 
     def is_finished(self):
         """
@@ -169,26 +238,95 @@ class Game:
     HARDCORE = "Hardcore"
     
     INITIAL_NAME = "Philip II"
+
+    # Timed phases of a frame, see set_stats()
+    PHASES = (("handle", "handle_event"), ("progress", "progress"), ("render", "render"))
+
     @staticmethod
     def get_instance():
         return Game.__instance
 
-    def __init__(self):
-        """ Initializes all game elements:
+    def __init__(self, leaderboard_path=Leaderboard.PATH):
+        """ Initializes game elements needed by the first frame:
             * Config
-            * Leaderboard
-            * Session
             * Menu
-            * game over screen
+        Session is created on start, the leaderboard and game over screen on first use, see preload()
+
+        :param leaderboard_path: (option) Path of the leaderboard database
         """
         Game.__instance = self
         self.config = Config()
+        self.difficulty = self.config.profiles[Game.MEDIUMCORE]
         self.state = Game.STATE_MENU
-        self.game_session = GameSession()
-        self.game_over_screen = GameOverScreen()
+        self.game_session = None
         self.menu = Menu()
         self.player_name = Game.INITIAL_NAME
-        self.leaderboard = Leaderboard()
+        self.leaderboard_path = leaderboard_path
+        self.stats = None
+        self.capture = None
+
+    @cached_property
+    def leaderboard(self):
+        """ Leaderboard, loaded on first use """
+        return Leaderboard(self.leaderboard_path)
+
+    @cached_property
+    def game_over_screen(self):
+        """ Game over screen, created on first use """
+        return GameOverScreen()
+
+    def preload(self):
+        """ Loads assets the menu does not need, so they are ready before they are shown
+        :returns: Generator loading one more asset on each step, main() steps it between frames
+        """
+        yield self.leaderboard
+        yield self.game_over_screen
+        sizes = [GameSession.FONTSIZE, Leaderboard.FONTSIZE, GameOverScreen.FONTSIZE, STATS_FONTSIZE]
+        # Sizes of the animated buttons
+        sizes += range(Button.FONTSIZE_SMALL, Button.FONTSIZE_BIG + 1)
+        for size in sizes:
+            yield fonts.get_font(FONT_NAME, size)
+
+    def close(self):
+        """ Releases resources loaded during the game """
+        if "leaderboard" in self.__dict__:
+            self.leaderboard.close()
+
+    def instrument(self):
+        """ Wraps handle_event(), progress() and render() into the active stats and capture
+        Timed methods are shadowed by instance attributes, so untimed calls have no overhead
+        """
+        recorders = [recorder for recorder in (self.stats, self.capture) if recorder is not None]
+        for phase, name in Game.PHASES:
+            self.__dict__.pop(name, None)
+            if recorders:
+                method = getattr(self, name)
+                for recorder in recorders:
+                    method = recorder.wrap(phase, method)
+                setattr(self, name, method)
+
+    def set_stats(self, stats):
+        """ Starts or stops timing of handle_event(), progress() and render()
+        :param stats: FrameStats with the phases of Game.PHASES to add timings to, None stops timing
+        """
+        self.stats = stats
+        self.instrument()
+
+    def set_capture(self, capture):
+        """ Starts or stops recording of handle_event(), progress() and render() into a profile capture
+        :param capture: Capture to add the phases to, None stops recording
+        """
+        self.capture = capture
+        self.instrument()
+
+    def object_counts(self):
+        """ :returns: Dictionary target type -> number of live targets """
+        if self.game_session is None:
+            return {}
+        return {
+            "balls": int(np.count_nonzero(self.game_session.balls.t > 0)),
+            "triangles": sum(not triangle.is_dead() for triangle in self.game_session.triangles),
+        }
 
     def handle_event(self, event):
         """ Handles events
@@ -217,23 +355,25 @@ class Game:
             self.game_session.progress()
             self.game_over_screen.progress()
         
-        if self.game_session.is_finished() and self.state is Game.STATE_PLAYING:
+        if self.state is Game.STATE_PLAYING and self.game_session.is_finished():
             self.set_state(Game.STATE_FINISHED)
 
-    def render(self):
-        """
-        :returns: PyGame screen with the whole game
+    def render(self, screen, alpha=1):
+        """ Renders the whole game
+        :param screen: Cleared pygame.Surface to render on, reused between frames
+        :param alpha: Fraction of the simulation tick elapsed since the last progress()
+        :returns: List of pygame.Rect areas drawn this frame
         """
-        screen = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
+        dirty = []
         if self.state is Game.STATE_PLAYING:
-            self.game_session.render(screen)
+            dirty += self.game_session.render(screen, alpha=alpha)
         elif self.state is Game.STATE_FINISHED:
-            self.game_session.render(screen, False, Game.FINISHED_GAME_TRANSPARENCY)
-            self.game_over_screen.render(screen)
-            screen.blit(self.leaderboard.render(), (0, HEIGHT * 0.18))
+            dirty += self.game_session.render(screen, False, Game.FINISHED_GAME_TRANSPARENCY, alpha)
+            dirty += self.game_over_screen.render(screen)
+            dirty += self.leaderboard.render(screen, HEIGHT * 0.18)
         elif self.state is Game.STATE_MENU:
-            self.menu.render(screen)
-        return screen
+            dirty += self.menu.render(screen)
+        return dirty
 
     def set_state(self, new_state):
         """ Changes active game element
@@ -243,21 +383,24 @@ class Game:
             return
         self.state = new_state
         if new_state is Game.STATE_PLAYING:
-            self.game_session = GameSession()
+            # Edits of the config apply from the next session
+            if self.config.reload():
+                self.difficulty = self.config.profiles[self.difficulty.name]
+            self.game_session = GameSession(self.difficulty)
         if new_state is Game.STATE_FINISHED:
             self.leaderboard.add(self.player_name, self.game_session.score)
 
     def get_score(self):
         """ Returns the score gained during last game session
         :returns: Score"""
-        return self.game_session.score
+        return self.game_session.score if self.game_session is not None else 0
 
     def set_difficulty(self, difficulty):
-        """ Sets game session diffficulty
+        """ Sets diffficulty of the next game sessions
         :param difficulty: New difficulty value, one of the 
              {Game.SOFTCORE, Game.MEDIUMCORE, Game.HARDCORE}
         """
-        self.config.set_difficulty(difficulty)
+        self.difficulty = self.config.profiles[difficulty]
 
 class GameOverScreen:
     
@@ -265,22 +408,24 @@ class GameOverScreen:
 
     def __init__(self):
         """ Initializes screen with restart button """
-        self.font = pygame.font.Font(FONT_NAME,  GameOverScreen.FONTSIZE)
         self.restart_button = Button("Back to menu", (WIDTH / 2, HEIGHT * 0.85)) 
 
     def render(self, screen: pygame.Surface):
         """ Blits text and button images onto the pygame surface
         :param screen: pygame.Surface to render on
+        :returns: List of pygame.Rect areas affected
         """
-        text_surface_1 = self.font.render(f"Game over, {Game.get_instance().player_name}", True, BLACK)
+        text_surface_1 = fonts.render_text(FONT_NAME, GameOverScreen.FONTSIZE, f"Game over, {Game.get_instance().player_name}", BLACK)
         text_rect_1 = text_surface_1.get_rect(center = (WIDTH // 2, int(HEIGHT * 0.07)))
-        screen.blit(text_surface_1, text_rect_1)
         
-        text_surface_2 = self.font.render(f"Your score is {Game.get_instance().get_score()}", True, BLACK)
+        text_surface_2 = fonts.render_text(FONT_NAME, GameOverScreen.FONTSIZE, f"Your score is {Game.get_instance().get_score()}", BLACK)
         text_rect_2 = text_surface_2.get_rect(center = (WIDTH // 2, int(HEIGHT * 0.15)))
-        screen.blit(text_surface_2, text_rect_2)
 
-        self.restart_button.render(screen)
+        return [
+            screen.blit(text_surface_1, text_rect_1),
+            screen.blit(text_surface_2, text_rect_2),
+            self.restart_button.render(screen),
+        ]
 
     def handle_click(self, pos):
         """
@@ -304,7 +449,6 @@ class Menu:
 
     def __init__(self):
         """ Initializes the menu with buttons and sets initial difficulty """
-        self.font = pygame.font.Font(FONT_NAME,  GameOverScreen.FONTSIZE)
         
         self.start_button = Button("New Game", (WIDTH / 2, HEIGHT * 0.3))
 
@@ -328,15 +472,18 @@ class Menu:
     def render(self, screen: pygame.Surface):
         """ Blits text and button images onto the pygame surface
         :param screen: pygame.Surface to render on
+        :returns: List of pygame.Rect areas affected
         """
-        text_surface = self.font.render(f"<Abstract_Name>", True, BLACK)
+        text_surface = fonts.render_text(FONT_NAME, GameOverScreen.FONTSIZE, f"<Abstract_Name>", BLACK)
         text_rect = text_surface.get_rect(center = (WIDTH // 2, int(HEIGHT * 0.07)))
-        screen.blit(text_surface, text_rect)
 
-        self.start_button.render(screen)
-        self.difficulty_button.render(screen)
-        self.quit_button.render(screen)
-        self.change_name_button.render(screen)
+        return [
+            screen.blit(text_surface, text_rect),
+            self.start_button.render(screen),
+            self.difficulty_button.render(screen),
+            self.quit_button.render(screen),
+            self.change_name_button.render(screen),
+        ]
 
     def handle_click(self, pos):
         """
@@ -389,38 +536,164 @@ class Menu:
         else:
             self.change_name_button.update_text(f"Player: {Game.get_instance().player_name}")
 
-def main():
-    """ Runs the game """
+def main(record=None, frames=None):
+    """ Runs the game
+    :param record: (option) Path of the file to record the session into, see recording.py
+    :param frames: (option) Number of frames to run, used by the startup benchmark
+    """
     # Initialize PyGame, clock and GameSession
     pygame.init()
     pygame.font.init()
 
     screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    # Targets fade out through per-pixel alpha, so they are drawn on a transparent buffer
+    back_buffer = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
+    screen.fill(WHITE)
+
+    recorder = None
+    if record is not None:
+        # Tools are imported only when used, they are not needed for the first frame
+        from secrets import randbits
+        from recording import Recorder
+        seed = randbits(63)
+        rng.seed(seed)
+        recorder = Recorder(record, seed)
     
     game = Game()
+    # Assets of the other screens are loaded between frames
+    assets = game.preload()
+    frame = 0
     clock = pygame.time.Clock()
     finished = False
+    # Simulation time not yet consumed by fixed ticks, in seconds
+    accumulator = 0
+    # Areas drawn during the previous frame, they have to be cleared
+    previous_dirty = []
+    # The whole window is shown on the first frame and after it was covered
+    full_update = True
+    # Frame timings are collected only while the overlay is shown
+    stats = FrameStats([phase for phase, _ in Game.PHASES])
+    overlay = StatsOverlay(FONT_NAME, STATS_FONTSIZE, BLACK, (WIDTH * 0.75, 10))
 
     # Main cycle
     while not finished:
-        clock.tick(FPS)
+        accumulator += clock.tick(FPS) / 1000
+        frame_start = perf_counter()
         # Handles events
-        for event in pygame.event.get():
+        events = pygame.event.get()
+        frame_input.capture()
+        for event in events:
             if event.type == pygame.QUIT:
                 finished = True
+            elif event.type in EXPOSE_EVENTS:
+                full_update = True
+            elif event.type == pygame.KEYDOWN and event.key == STATS_KEY:
+                game.set_stats(stats if game.stats is None else None)
+            elif event.type == pygame.KEYDOWN and event.key == PROFILE_KEY:
+                if game.capture is None:
+                    from capture import Capture
+                    game.set_capture(Capture())
+                else:
+                    game.capture.stop()
+                    game.set_capture(None)
             else :
                 game.handle_event(event)
 
-        game.progress()
+        # Advances simulation by fixed ticks, dropping the backlog after a slow frame
+        ticks = 0
+        while accumulator >= TICK_TIME and ticks < MAX_CATCH_UP_TICKS:
+            game.progress()
+            accumulator -= TICK_TIME
+            ticks += 1
+        accumulator = min(accumulator, TICK_TIME)
+        alpha = accumulator / TICK_TIME
+
+        if recorder is not None:
+            recorder.frame(ticks, frame_input, events)
         
-        # Renders game
-        screen.blit(game.render(), (0, 0))
-
-        # Updates screen
-        pygame.display.update()
-        screen.fill(WHITE)
+        if DIRTY_RECTS:
+            # Only areas drawn this or previous frame have changed
+            for rect in previous_dirty:
+                back_buffer.fill(TRANSPARENT, rect)
+            dirty = game.render(back_buffer, alpha)
+            if game.stats is not None:
+                dirty += overlay.render(back_buffer, stats, game.object_counts())
+            for rect in dirty + previous_dirty:
+                screen.fill(WHITE, rect)
+                screen.blit(back_buffer, rect, rect)
+            if full_update:
+                pygame.display.update()
+                full_update = False
+            else:
+                pygame.display.update(dirty + previous_dirty)
+            previous_dirty = dirty
+        else:
+            # Renders game into the reused back buffer
+            back_buffer.fill(TRANSPARENT)
+            game.render(back_buffer, alpha)
+            if game.stats is not None:
+                overlay.render(back_buffer, stats, game.object_counts())
+            screen.blit(back_buffer, (0, 0))
+
+            # Updates screen
+            pygame.display.update()
+            screen.fill(WHITE)
+
+        if game.stats is not None:
+            stats.end_frame(perf_counter() - frame_start)
+        if game.capture is not None:
+            game.capture.mark("frame", frame_start, perf_counter())
+
+        frame += 1
+        if frame == frames:
+            finished = True
+        if not finished:
+            next(assets, None)
+    if game.capture is not None:
+        game.capture.stop()
+    if recorder is not None:
+        recorder.close()
     pygame.quit()
-    game.leaderboard.save()
+    game.close()
+    stats.dump()
+
+def replay(path):
+    """ Replays recorded session without rendering, as fast as possible
+    Results are added to an in-memory copy of the leaderboard
+
+    :param path: Path of the recording, see main()
+    :returns: Game in the state after the last recorded frame
+    """
+    # Events posted by the game need the video system, but no window is opened
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    pygame.init()
+
+    from recording import Recording
+    recording = Recording(path)
+    rng.seed(recording.seed)
+    game = Game(":memory:")
+    for ticks, mouse_pos, pressed, events in recording:
+        frame_input.set(mouse_pos, pressed)
+        finished = False
+        for event in events:
+            if event.type == pygame.QUIT:
+                finished = True
+            else:
+                game.handle_event(event)
+        for _ in range(ticks):
+            game.progress()
+        if finished:
+            break
+    return game
 
 if __name__ == "__main__":
-    main()
+    from argparse import ArgumentParser
+    parser = ArgumentParser(description="Runs the game")
+    parser.add_argument("--record", metavar="PATH", help="record the session input into the file")
+    parser.add_argument("--replay", metavar="PATH", help="replay the recorded session without display")
+    args = parser.parse_args()
+    if args.replay is not None:
+        game = replay(args.replay)
+        print(f"{game.state}, score {game.get_score()}")
+    else:
+        main(args.record)
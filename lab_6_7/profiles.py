@@ -0,0 +1,109 @@
+from dataclasses import dataclass, field
+from math import pi, cos, sin
+import json
+
+"""
+Implements immutable difficulty settings of the targets and the game session
+
+Classes:
+
+    BallProfile
+    TriangleProfile
+    DifficultyProfile
+
+Functions:
+
+    check(condition, message)
+    is_number(value)
+    load_profiles(path)
+
+"""
+
+def check(condition, message):
+    """
+    Raises ValueError with the message if condition does not hold
+
+    :param condition: Validated condition
+    :param message: Description of the violated requirement
+    """
+    if not condition:
+        raise ValueError(message)
+
+def is_number(value):
+    """ Returns True if value is int or float, bool is not considered a number """
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+@dataclass(frozen=True)
+class BallProfile:
+    """ Ball parameters of a difficulty, see config.json """
+    MAX_V: int = 4
+    MIN_R: int = 30
+    MAX_R: int = 100
+    DIFFICULTY_SCORE_FACTOR: float = 1
+
+    def __post_init__(self):
+        for name in ("MAX_V", "MIN_R", "MAX_R"):
+            check(isinstance(getattr(self, name), int) and getattr(self, name) >= 0,
+                f"Ball {name} must be a non-negative integer")
+        check(0 < self.MIN_R <= self.MAX_R, "Ball radii must satisfy 0 < MIN_R <= MAX_R")
+        check(is_number(self.DIFFICULTY_SCORE_FACTOR) and self.DIFFICULTY_SCORE_FACTOR >= 0,
+            "Ball DIFFICULTY_SCORE_FACTOR must be a non-negative number")
+
+@dataclass(frozen=True)
+class TriangleProfile:
+    """ Triangle parameters of a difficulty, see config.json
+    Rotation per tick is precomputed as cosine and sine of v_phi
+    """
+    v: float = 5
+    v_phi: float = 2 * pi / 60
+    DIFFICULTY_SCORE_FACTOR: float = 1
+    V_PHI_COS: float = field(init=False)
+    V_PHI_SIN: float = field(init=False)
+
+    def __post_init__(self):
+        check(is_number(self.v) and self.v >= 0, "Triangle v must be a non-negative number")
+        check(is_number(self.v_phi), "Triangle v_phi must be a number")
+        check(is_number(self.DIFFICULTY_SCORE_FACTOR) and self.DIFFICULTY_SCORE_FACTOR >= 0,
+            "Triangle DIFFICULTY_SCORE_FACTOR must be a non-negative number")
+        object.__setattr__(self, "V_PHI_COS", cos(self.v_phi))
+        object.__setattr__(self, "V_PHI_SIN", sin(self.v_phi))
+
+@dataclass(frozen=True)
+class DifficultyProfile:
+    """ All settings of a game session with the given difficulty """
+    name: str = "Mediumcore"
+    # Numbers of balls and triangles
+    N: int = 5
+    M: int = 2
+    # Session duration in ticks
+    T: int = 120
+    ball: BallProfile = BallProfile()
+    triangle: TriangleProfile = TriangleProfile()
+
+    def __post_init__(self):
+        for name in ("N", "M"):
+            check(isinstance(getattr(self, name), int) and getattr(self, name) >= 0,
+                f"GameSession {name} must be a non-negative integer")
+        check(isinstance(self.T, int) and self.T > 0, "GameSession Session_Time must be a positive integer")
+
+def load_profiles(path):
+    """
+    Reads and validates all difficulty profiles from the config file
+
+    :param path: Path of the config file, see config.json
+    :returns: Dictionary difficulty name -> DifficultyProfile
+    :raises ValueError: If the file is not a valid config
+    """
+    with open(path) as file:
+        data = json.load(file)
+    try:
+        session, balls, triangles = data["GameSession"], data["Ball"], data["Triangle"]
+        names = next(iter(balls.values())).keys()
+        return {
+            name: DifficultyProfile(name, session["N"], session["M"], session["Session_Time"],
+                BallProfile(**{key: values[name] for key, values in balls.items()}),
+                TriangleProfile(**{key: values[name] for key, values in triangles.items()}))
+            for name in names
+        }
+    except (KeyError, TypeError, AttributeError, StopIteration) as error:
+        raise ValueError(f"{path} is malformed: {error!r}") from error
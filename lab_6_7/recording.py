@@ -0,0 +1,178 @@
+from queue import SimpleQueue
+from threading import Thread
+import struct
+import pygame
+
+"""
+Implements compact binary recording of the polled input and events of a session
+
+The file starts with a header followed by one record per frame:
+
+    header: magic, format version, seed of the game randomness
+    frame:  ticks run, mouse position, numbers of pressed keys and events
+            scancodes of pressed keys
+            events, each one is a type code followed by its fields
+
+Records are only ever appended, a file cut short by a crash is read up to the last whole frame
+
+Classes:
+
+    RecordWriter
+    Recorder
+    Recording
+
+Constants:
+
+    MAGIC, VERSION
+
+"""
+
+MAGIC = b"RCRD"
+VERSION = 1
+
+HEADER = struct.Struct("<4sBq")
+FRAME = struct.Struct("<BhhBB")
+SCANCODE = struct.Struct("<H")
+EVENT_TYPE = struct.Struct("<B")
+MOUSE_EVENT = struct.Struct("<hhB")
+KEY_EVENT = struct.Struct("<iB")
+
+# Recorded event types, the games ignore all the other ones
+EVENT_CODES = {
+    pygame.QUIT: 0,
+    pygame.MOUSEBUTTONDOWN: 1,
+    pygame.MOUSEBUTTONUP: 2,
+    pygame.KEYDOWN: 3,
+    pygame.KEYUP: 4,
+}
+EVENT_TYPES = {code: event_type for event_type, code in EVENT_CODES.items()}
+
+class RecordWriter:
+    """ Appends data to a file on a background thread, so writing never stalls a frame """
+
+    BUFFER_SIZE = 1 << 16
+
+    def __init__(self, path):
+        """ Creates the file and starts the writer thread
+        :param path: Path of the file, existing file is overwritten
+        """
+        self.file = open(path, "wb", buffering=RecordWriter.BUFFER_SIZE)
+        self.queue = SimpleQueue()
+        self.thread = Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def write(self, data):
+        """ Queues data to be appended to the file
+        :param data: bytes to be written
+        """
+        self.queue.put(data)
+
+    def run(self):
+        """ Writes queued data until close() is requested """
+        with self.file:
+            for data in iter(self.queue.get, None):
+                self.file.write(data)
+
+    def close(self):
+        """ Writes all queued data and closes the file """
+        self.queue.put(None)
+        self.thread.join()
+
+class Recorder:
+    """ Packs the input of every frame into the recording """
+
+    def __init__(self, path, seed):
+        """ Starts new recording
+        :param path: Path of the recording file
+        :param seed: Seed of the game randomness, the session is replayed from it
+        """
+        self.writer = RecordWriter(path)
+        self.writer.write(HEADER.pack(MAGIC, VERSION, seed))
+
+    def frame(self, ticks, frame_input, events):
+        """ Records a frame
+        :param ticks: Number of simulation ticks run during the frame
+        :param frame_input: FrameInput the frame was handled with, see inputs.py
+        :param events: List of pygame.event.Event handled during the frame
+        """
+        x, y = frame_input.get_mouse_pos()
+        pressed = [scancode for scancode, down in enumerate(frame_input.get_pressed()) if down]
+        events = [event for event in events if event.type in EVENT_CODES]
+
+        data = [FRAME.pack(ticks, x, y, len(pressed), len(events))]
+        data += [SCANCODE.pack(scancode) for scancode in pressed]
+        for event in events:
+            data.append(EVENT_TYPE.pack(EVENT_CODES[event.type]))
+            if event.type in (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP):
+                data.append(MOUSE_EVENT.pack(*event.pos, event.button))
+            elif event.type in (pygame.KEYDOWN, pygame.KEYUP):
+                text = getattr(event, "unicode", "").encode()
+                data.append(KEY_EVENT.pack(event.key, len(text)))
+                data.append(text)
+        self.writer.write(b"".join(data))
+
+    def close(self):
+        """ Finishes the recording """
+        self.writer.close()
+
+class Recording:
+    """ Recorded session, iterating over it yields frames (ticks, mouse_pos, pressed, events)
+
+    pressed is a pygame.key.ScancodeWrapper, so it is indexable like pygame.key.get_pressed()
+    """
+
+    def __init__(self, path):
+        """ Reads the recording
+        :param path: Path of the recording file
+        """
+        with open(path, "rb") as file:
+            self.data = file.read()
+        magic, version, self.seed = HEADER.unpack_from(self.data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a recording of version {VERSION}")
+        self.scancodes_number = len(pygame.key.get_pressed())
+
+    def __iter__(self):
+        offset = HEADER.size
+        try:
+            while offset < len(self.data):
+                frame, offset = self.read_frame(offset)
+                yield frame
+        except struct.error:
+            # The last frame was not written completely
+            return
+
+    def read_frame(self, offset):
+        """ Unpacks a frame
+        :param offset: Position of the frame in the data
+        :returns: Frame and position of the next one
+        """
+        data = self.data
+        ticks, x, y, keys_number, events_number = FRAME.unpack_from(data, offset)
+        offset += FRAME.size
+
+        pressed = [False] * self.scancodes_number
+        for _ in range(keys_number):
+            pressed[SCANCODE.unpack_from(data, offset)[0]] = True
+            offset += SCANCODE.size
+
+        events = []
+        for _ in range(events_number):
+            event_type = EVENT_TYPES[EVENT_TYPE.unpack_from(data, offset)[0]]
+            offset += EVENT_TYPE.size
+            if event_type in (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP):
+                event_x, event_y, button = MOUSE_EVENT.unpack_from(data, offset)
+                offset += MOUSE_EVENT.size
+                events.append(pygame.event.Event(event_type, pos=(event_x, event_y), button=button))
+            elif event_type in (pygame.KEYDOWN, pygame.KEYUP):
+                key, length = KEY_EVENT.unpack_from(data, offset)
+                offset += KEY_EVENT.size
+                if offset + length > len(data):
+                    raise struct.error("truncated key event")
+                text = data[offset:offset + length].decode()
+                offset += length
+                events.append(pygame.event.Event(event_type, key=key, unicode=text))
+            else:
+                events.append(pygame.event.Event(event_type))
+
+        return (ticks, (x, y), pygame.key.ScancodeWrapper(pressed), events), offset
@@ -0,0 +1,69 @@
+import numpy as np
+
+"""
+Implements seedable source of random numbers drawn in blocks
+
+Classes:
+
+    RandomStream
+
+Functions:
+
+    seed(seed=None)
+    random()
+    randint(a, b)
+    uniform(a, b)
+
+Constants:
+
+    stream
+
+"""
+
+class RandomStream:
+    """ Stream of random numbers backed by a NumPy Generator
+
+    Uniform floats are pre-drawn in blocks and handed out one by one, so a single
+    draw costs about as much as a list iteration. Vectorized code may draw from
+    the generator member directly, the sequence stays reproducible from the seed
+    """
+    BLOCK = 4096
+
+    def __init__(self, seed=None, block=BLOCK):
+        """ Initializes the stream
+        :param seed: (option) Seed of the stream, fresh entropy is used if None
+        :param block: (option) Number of floats drawn at once
+        """
+        self.block = block
+        self.seed(seed)
+
+    def seed(self, seed=None):
+        """ Restarts the stream from the seed, pre-drawn numbers are discarded
+        :param seed: (option) Seed of the stream, fresh entropy is used if None
+        """
+        self.generator = np.random.default_rng(seed)
+        self.values = iter(())
+
+    def random(self):
+        """ Returns random float in [0, 1) """
+        try:
+            return next(self.values)
+        except StopIteration:
+            self.values = iter(self.generator.random(self.block).tolist())
+            return next(self.values)
+
+    def randint(self, a, b):
+        """ Returns random integer in [a, b], including both end points """
+        return a + int(self.random() * (b - a + 1))
+
+    def uniform(self, a, b):
+        """ Returns random float in [a, b) """
+        return a + (b - a) * self.random()
+
+# Shared stream of the game, seed() it to make a session reproducible
+stream = RandomStream()
+
+seed = stream.seed
+random = stream.random
+randint = stream.randint
+uniform = stream.uniform
@@ -0,0 +1,67 @@
+from bisect import insort
+import sqlite3
+
+"""
+Implements persistent storage of the game results
+
+Classes:
+
+    ScoreStore
+
+"""
+
+class ScoreStore:
+    """ Full history of results kept in an SQLite database, best of them are cached in memory
+
+    Every result is committed in its own transaction, so a crash mid-write loses at most
+    that result and never corrupts the history. Results are indexed by score, so inserts
+    and the top query stay logarithmic in the history length
+    """
+
+    def __init__(self, path, size):
+        """ Opens the database, creating it if needed
+        :param path: Path of the database file, ":memory:" keeps results only until close()
+        :param size: Number of the best results cached
+        """
+        self.size = size
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS scores (id INTEGER PRIMARY KEY, score INTEGER NOT NULL, name TEXT NOT NULL)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS scores_by_score ON scores (score DESC, id)")
+
+        # Sorted keys (-score, id, name), earlier result is ranked higher among equal scores
+        self.top = [(-score, id, name) for id, score, name in self.connection.execute(
+            "SELECT id, score, name FROM scores ORDER BY score DESC, id LIMIT ?", (size,))]
+
+    def add(self, name, score):
+        """ Stores new result
+        :param name: Player name
+        :param score: Player result
+        """
+        self.add_many([(name, score)])
+
+    def add_many(self, results):
+        """ Stores results in one transaction
+        :param results: Iterable of pairs (name, score)
+        """
+        keys = []
+        with self.connection:
+            for name, score in results:
+                id = self.connection.execute("INSERT INTO scores (score, name) VALUES (?, ?)", (score, name)).lastrowid
+                keys.append((-score, id, name))
+
+        # Cache is updated only once the results are committed
+        for key in keys:
+            if len(self.top) < self.size or key < self.top[-1]:
+                insort(self.top, key)
+                del self.top[self.size:]
+
+    def best(self):
+        """ :returns: List of the best results (score, name), highest first """
+        return [(-score, name) for score, _, name in self.top]
+
+    def close(self):
+        """ Closes the database """
+        self.connection.close()
@@ -0,0 +1,55 @@
+from argparse import ArgumentParser
+from statistics import median
+from time import perf_counter
+import os
+import subprocess
+import sys
+
+"""
+Measures time to the first frame of the game, every run starts a fresh interpreter
+
+Usage:
+
+    python startup.py [--runs RUNS] [--headless]
+
+"""
+
+# Prints seconds spent on importing the game and on showing its first frame
+CHILD = """
+from time import perf_counter
+start = perf_counter()
+import main
+imported = perf_counter()
+main.main(frames=1)
+print(imported - start, perf_counter() - start)
+"""
+
+def measure(headless):
+    """ Starts the game in a new process and closes it after the first frame
+    :param headless: Use the dummy video driver instead of opening a window
+    :returns: Tuple (process, import, first frame) of times in seconds,
+        process time includes the interpreter start and shutdown
+    """
+    env = dict(os.environ)
+    if headless:
+        env["SDL_VIDEODRIVER"] = "dummy"
+    env["PYGAME_HIDE_SUPPORT_PROMPT"] = "1"
+    start = perf_counter()
+    output = subprocess.run([sys.executable, "-c", CHILD], env=env, check=True,
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+    process = perf_counter() - start
+    imported, first_frame = map(float, output.split()[-2:])
+    return process, imported, first_frame
+
+def main():
+    parser = ArgumentParser(description="Time to the first frame benchmark")
+    parser.add_argument("--runs", type=int, default=5, help="number of measured starts")
+    parser.add_argument("--headless", action="store_true", help="do not open a window")
+    args = parser.parse_args()
+
+    results = [measure(args.headless) for _ in range(args.runs)]
+    for name, times in zip(("process", "import", "first frame"), zip(*results)):
+        print(f"{name:>12}: median {median(times) * 1000:7.1f}ms, min {min(times) * 1000:7.1f}ms")
+
+if __name__ == '__main__':
+    main()
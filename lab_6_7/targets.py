@@ -1,7 +1,9 @@
+import numpy as np
 import pygame
 from pygame.draw import *
-from random import randint, random
-from math import pi, cos, sin
+from rng import randint, random, stream
+from profiles import BallProfile, TriangleProfile
+from math import pi, cos, sin, hypot
 
 FPS = 60
 WIDTH, HEIGHT = 1200, 900
@@ -19,129 +21,133 @@ SPECIAL = (0, 17, 102)
 
 COLORS = [RED, BLUE, YELLOW, GREEN, MAGENTA, CYAN]
 
-def dist2(p, q):
+def interpolate(previous, current, alpha):
     """
-    Returns distance squared between points p and q
-    
-    :param p: List of coordinates (x, y) of the first point
-    :param q: List of coordinates (x, y) of the second point
-    
-    .. warning:: Distance returned is squared
-    """
-    x1, y1 = p
-    x2, y2 = q
-    return (x1 - x2) ** 2 + (y1 - y2) ** 2
+    Blends two consecutive states for rendering between simulation ticks
 
-class Ball:
+    :param previous: Value at the previous tick
+    :param current: Value at the current tick
+    :param alpha: Fraction [0, 1] of the tick elapsed since the current state
+    """
+    return previous + (current - previous) * alpha
 
-    MAX_V = 4
-    MIN_R = 30
-    MAX_R = 100
-    DIFFICULTY_SCORE_FACTOR = 1
+class BallSwarm:
+    """ Stores all balls as NumPy arrays and progresses them with masked vector operations
 
-    # Collison types
-    COLLISION_NEGATIVE = -1 # Ball's too far to the left/top
-    COLLISION_NONE     = 0  # Ball's inside the walls
-    COLLISION_POSITIVE = 1  # Ball's too far to the right/bottom
+    Balls bounce off the walls with new random velocities
+    and respawn when their life clock runs out
+    """
 
-    def __init__(self):
-        """ Randomly choses position (x, y), velocity (v_x, v_y), color and life counter t """
-        self.reset()
-    
-    def reset(self):
-        """ Randomly choses position (x, y), velocity (v_x, v_y), color and life counter t """
-        self.x = randint(MARGIN, WIDTH - MARGIN)
-        self.y = randint(MARGIN, HEIGHT - MARGIN)
-        self.r = randint(Ball.MIN_R, Ball.MAX_R)
-        self.t = randint(150, 250)
-        self.color = COLORS[randint(0, 5)]
-        self.v_x = randint(-Ball.MAX_V, Ball.MAX_V + 1)
-        self.v_y = randint(-Ball.MAX_V, Ball.MAX_V + 1)
+    def __init__(self, n, profile=BallProfile()):
+        """ Randomly initializes n balls
+        :param n: Number of balls
+        :param profile: (option) BallProfile of the difficulty
+        """
+        self.n = n
+        self.profile = profile
+        self.x = np.empty(n)
+        self.y = np.empty(n)
+        self.r = np.empty(n, dtype=int)
+        self.v_x = np.empty(n)
+        self.v_y = np.empty(n)
+        self.t = np.empty(n, dtype=int)
+        self.color = np.empty(n, dtype=int)
+        # Positions of the previous tick for interpolation
+        self.prev_x = np.empty(n)
+        self.prev_y = np.empty(n)
+        self.reset(np.ones(n, dtype=bool))
+
+    def __len__(self):
+        return self.n
+
+    def reset(self, mask):
+        """ Randomly choses position, radius, life counter, color and velocity of masked balls
+        :param mask: Boolean array, True for balls to be reset
+        """
+        k = int(np.count_nonzero(mask))
+        if not k:
+            return
+        rng = stream.generator
+        self.x[mask] = rng.integers(MARGIN, WIDTH - MARGIN + 1, k)
+        self.y[mask] = rng.integers(MARGIN, HEIGHT - MARGIN + 1, k)
+        self.r[mask] = rng.integers(self.profile.MIN_R, self.profile.MAX_R + 1, k)
+        self.t[mask] = rng.integers(150, 251, k)
+        self.color[mask] = rng.integers(0, len(COLORS), k)
+        self.v_x[mask] = rng.integers(-self.profile.MAX_V, self.profile.MAX_V + 2, k)
+        self.v_y[mask] = rng.integers(-self.profile.MAX_V, self.profile.MAX_V + 2, k)
+        self.prev_x[mask] = self.x[mask]
+        self.prev_y[mask] = self.y[mask]
 
     def move(self):
-        """ Calculates new position (x, y) """
+        """ Calculates new positions """
+        self.prev_x[:] = self.x
+        self.prev_y[:] = self.y
         self.x += self.v_x
         self.y += self.v_y
 
-    def reduce_life_clock(self):
-        """ Reduces life clock
-        When it reaches 0, target is considered to be dead
+    def reflect(self):
+        """ Generates new random velocities for balls which hit the walls
+        After velocity generation balls move away from the walls
         """
+        left = (self.x < self.r) & (self.v_x < 0)
+        right = (self.x > WIDTH - self.r) & (self.v_x > 0)
+        top = (self.y < self.r) & (self.v_y < 0)
+        bottom = (self.y > HEIGHT - self.r) & (self.v_y > 0)
+        hit = left | right | top | bottom
+        k = int(np.count_nonzero(hit))
+        if not k:
+            return
+        v_max = self.profile.MAX_V
+        rng = stream.generator
+        # Velocity pointing away from the wall for each collision type, random for the free axis
+        self.v_x[hit] = np.select(
+            [left[hit], right[hit]],
+            [rng.integers(1, v_max + 2, k), rng.integers(-v_max, 1, k)],
+            rng.integers(-v_max, v_max + 2, k))
+        self.v_y[hit] = np.select(
+            [top[hit], bottom[hit]],
+            [rng.integers(1, v_max + 2, k), rng.integers(-v_max, 1, k)],
+            rng.integers(-v_max, v_max + 2, k))
+
+    def progress(self):
+        """ Moves balls, handles wall collisions, reduces life clocks and respawns dead balls """
+        self.move()
+        self.reflect()
         self.t -= 1
+        dead = self.t <= 0
+        if dead.any():
+            self.reset(dead)
 
-    def check_collision(self):
+    def clicked(self, positions):
         """
-        Determines if the ball hit the wall and returns collision type
+        Checks which balls are hit by mouse clicks
 
-        :returns: List (x_type, y_type), where x_type and y_type are
-              one of the {COLLISION_NEGATIVE, COLLISION_NONE, COLLISION_POTIVE}
+        :param positions: Array of shape (k, 2) with click positions (x, y)
+        :returns: Boolean array of shape (k, n), True for balls which were hit
         """
-        x_type = Ball.COLLISION_NONE
-        if self.x < self.r and self.v_x < 0:
-            x_type = Ball.COLLISION_NEGATIVE
-        elif self.x > WIDTH - self.r and self.v_x > 0:
-            x_type = Ball.COLLISION_POSITIVE
-    
-        y_type = Ball.COLLISION_NONE
-        if self.y < self.r and self.v_y < 0:
-            y_type = Ball.COLLISION_NEGATIVE
-        elif self.y > HEIGHT - self.r and self.v_y > 0:
-            y_type = Ball.COLLISION_POSITIVE
-
-        return (x_type, y_type)
-
-    def generate_velocity(self, x_type, y_type):
-        """
-        Generates random velocity for the ball after wall collision
-        After velocity generation ball will move away from the wall
-
-        :param x_type: Type of the collision with vertical walls,
-                   one of the {COLLISION_NEGATIVE, COLLISION_NONE, COLLISION_POTIVE}
-        :param y_type: Type of the collision with horizontal walls,
-                   one of the {COLLISION_NEGATIVE, COLLISION_NONE, COLLISION_POTIVE}
-         """
-        self.v_x = randint(-Ball.MAX_V, Ball.MAX_V + 1)
-        if x_type is Ball.COLLISION_NEGATIVE:
-            self.v_x = randint(1, Ball.MAX_V + 1)
-        elif x_type is Ball.COLLISION_POSITIVE:
-            self.v_x = randint(-Ball.MAX_V, 0)
-
-        self.v_y = randint(-Ball.MAX_V, Ball.MAX_V + 1)
-        if y_type is Ball.COLLISION_NEGATIVE:
-            self.v_y = randint(1, Ball.MAX_V + 1)
-        elif y_type is Ball.COLLISION_POSITIVE:
-            self.v_y = randint(-Ball.MAX_V, 0)
+        x, y = positions[:, 0:1], positions[:, 1:2]
+        return (self.x - x) ** 2 + (self.y - y) ** 2 <= self.r ** 2
 
-    def is_clicked(self, pos):
-        """
-        Checks if mouse click hit the ball
+    def get_scores(self, mask):
+        """ Returns array of scores awarded for hitting masked balls, smaller balls with more life left give more """
+        return ((self.t[mask] / self.r[mask]) ** 0.5 * 4 * self.profile.DIFFICULTY_SCORE_FACTOR).astype(int)
 
-        :param pos: Mouse click position
-        :returns: True if the ball was hit, False otherwise
-        """
-        return dist2(pos, (self.x, self.y)) <= self.r ** 2
-    
-    def get_score(self):
-        """ Returns score awarded for a successful hit """
-        return int((self.t / self.r) ** 0.5 * 4
-            * Ball.DIFFICULTY_SCORE_FACTOR)
-    
-    def terminate(self):
-        """ Marks the ball as dead """
-        self.t = 0
+    def terminate(self, mask):
+        """ Marks masked balls as dead """
+        self.t[mask] = 0
 
-    def is_dead(self):
-        """ Returns True if the ball should be removed """
-        return self.t <= 0
-    
-    def render(self, screen, transparency_factor = 1):
+    def render(self, screen, transparency_factor = 1, alpha = 1):
         """
-        :param screen: PyGame screen to render ball on
+        :param screen: PyGame screen to render balls on
         :param transparency_factor: Multiplies transparency by this
+        :param alpha: Fraction of the simulation tick elapsed, used to interpolate positions
+        :returns: List of pygame.Rect areas affected
         """
-        circle(screen,
-            (*self.color, int(self.t * transparency_factor)),
-            (self.x, self.y), self.r)
+        x = interpolate(self.prev_x, self.x, alpha).tolist()
+        y = interpolate(self.prev_y, self.y, alpha).tolist()
+        transparency = (self.t * transparency_factor).astype(int).tolist()
+        return [circle(screen, (*COLORS[c], a), (x_i, y_i), r)
+            for x_i, y_i, r, c, a in zip(x, y, self.r.tolist(), self.color.tolist(), transparency)]
 
 
 class Triangle:
@@ -149,13 +155,16 @@ class Triangle:
     MOVING, TURNING_LEFT, TURNING_RIGHT = 'move', 'left', 'right'
     move_t, turn_t = 30, 10 # Average duration of movement states
     
-    v_phi = 2 * pi / 60
-    v = 5
+    # Cached orientation is renormalized after this many incremental rotations
+    RENORMALIZE_PERIOD = 64
     
     A, B = 60, 25 # Length and half width
 
-    def __init__(self):
-        """" Randomly chooses position and orientation for the ball """
+    def __init__(self, profile=TriangleProfile()):
+        """" Randomly chooses position and orientation for the ball
+        :param profile: (option) TriangleProfile of the difficulty
+        """
+        self.profile = profile
         self.reset()
 
     def reset(self):
@@ -163,22 +172,45 @@ class Triangle:
         self.x = randint(MARGIN, WIDTH - MARGIN)
         self.y = randint(MARGIN, HEIGHT - MARGIN)
         self.t = 255
-        self.phi = random() * 2 * pi
+        phi = random() * 2 * pi
+        self.cos_phi, self.sin_phi = cos(phi), sin(phi)
+        self.rotations = 0
         self.state = Triangle.MOVING
+        self.prev_x, self.prev_y = self.x, self.y
+        self.prev_cos_phi, self.prev_sin_phi = self.cos_phi, self.sin_phi
+
+    def rotate(self, d_phi_cos, d_phi_sin):
+        """
+        Turns the triangle updating the cached orientation (cos phi, sin phi) incrementally
+
+        :param d_phi_cos: Cosine of the rotation angle
+        :param d_phi_sin: Sine of the rotation angle
+        """
+        self.cos_phi, self.sin_phi = (self.cos_phi * d_phi_cos - self.sin_phi * d_phi_sin,
+            self.sin_phi * d_phi_cos + self.cos_phi * d_phi_sin)
+        self.rotations += 1
+        # Rounding errors accumulate, so the direction vector is scaled back to unit length
+        if self.rotations >= Triangle.RENORMALIZE_PERIOD:
+            norm = hypot(self.cos_phi, self.sin_phi)
+            self.cos_phi /= norm
+            self.sin_phi /= norm
+            self.rotations = 0
 
     def move(self):
         """ Calculates new position (x, y), movement phase state and orientaion phi """
+        self.prev_x, self.prev_y = self.x, self.y
+        self.prev_cos_phi, self.prev_sin_phi = self.cos_phi, self.sin_phi
         if self.state is Triangle.MOVING:
-            self.x += Triangle.v * cos(self.phi)
-            self.y += Triangle.v * sin(self.phi)
+            self.x += self.profile.v * self.cos_phi
+            self.y += self.profile.v * self.sin_phi
             if randint(0, Triangle.move_t) == 0:
                 self.state = Triangle.TURNING_LEFT if randint(0, 2) else Triangle.TURNING_RIGHT
         elif self.state is Triangle.TURNING_LEFT:
-            self.phi += Triangle.v_phi
+            self.rotate(self.profile.V_PHI_COS, self.profile.V_PHI_SIN)
             if randint(0, Triangle.turn_t) == 0:
                 self.state = Triangle.MOVING
         else:
-            self.phi -= Triangle.v_phi
+            self.rotate(self.profile.V_PHI_COS, -self.profile.V_PHI_SIN)
             if randint(0, Triangle.turn_t) == 0:
                 self.state = Triangle.MOVING
 
@@ -214,10 +246,29 @@ class Triangle:
         (x axis towards vertice, y alongside shortest side)
         by rotation by -phi
         """
-        click_x = cos(self.phi) * click_x + sin(self.phi) * click_y
-        click_y = -sin(self.phi) * click_x + sin(self.phi) * click_y
+        click_x, click_y = (self.cos_phi * click_x + self.sin_phi * click_y,
+            -self.sin_phi * click_x + self.cos_phi * click_y)
         # Triangle is an intersection of x > 0, x + y > 0 and x - y > 0
         return click_x > 0 and click_x / Triangle.A + click_y / Triangle.B <= 1 and click_x / Triangle.A - click_y / Triangle.B <= 1
+
+    @staticmethod
+    def clicked(triangles, positions):
+        """
+        Checks which triangles are hit by mouse clicks, see is_clicked()
+
+        :param triangles: List of Triangle objects
+        :param positions: Array of shape (k, 2) with click positions (x, y)
+        :returns: Boolean array of shape (k, len(triangles)), True for triangles which were hit
+        """
+        x = np.array([triangle.x for triangle in triangles])
+        y = np.array([triangle.y for triangle in triangles])
+        c = np.array([triangle.cos_phi for triangle in triangles])
+        s = np.array([triangle.sin_phi for triangle in triangles])
+        d_x, d_y = positions[:, 0:1] - x, positions[:, 1:2] - y
+        # Canonical basis of each triangle, scaled so that it is (1, 0), (0, 1), (0, -1)
+        u = (c * d_x + s * d_y) / Triangle.A
+        v = (-s * d_x + c * d_y) / Triangle.B
+        return (u > 0) & (u + v <= 1) & (u - v <= 1)
     
     def get_score(self):
         """ Returns score awarded for a successful hit """
@@ -231,16 +282,24 @@ class Triangle:
         transparency = max(0, self.t * transparency_factor)
         return (*SPECIAL, transparency)
 
-    def render(self, screen, transparency_factor = 1):
+    def render(self, screen, transparency_factor = 1, alpha = 1):
         """
         :param screen: PyGame screen to render ball on
         :param transparency_factor: Multiplies transparency by this
+        :param alpha: Fraction of the simulation tick elapsed, used to interpolate the position
+        :returns: pygame.Rect of the affected area
         """
-        vertices_r = [Triangle.A, Triangle.B, Triangle.B]
-        vertices_phi = [self.phi, self.phi + pi / 2, self.phi - pi / 2]
-
-        vertices = [(r * cos(phi), r * sin(phi)) for r, phi in zip(vertices_r, vertices_phi)]
+        x = interpolate(self.prev_x, self.x, alpha)
+        y = interpolate(self.prev_y, self.y, alpha)
+        c = interpolate(self.prev_cos_phi, self.cos_phi, alpha)
+        s = interpolate(self.prev_sin_phi, self.sin_phi, alpha)
+        # Blended direction is shorter than unit, turn per tick is small enough to just rescale it
+        norm = hypot(c, s)
+        c, s = c / norm, s / norm
+
+        # Vertices at angles phi, phi + pi / 2 and phi - pi / 2
+        vertices = [(Triangle.A * c, Triangle.A * s), (-Triangle.B * s, Triangle.B * c), (Triangle.B * s, -Triangle.B * c)]
         
-        polygon(screen,
+        return polygon(screen,
             self.get_color(transparency_factor),
-            [(self.x + dx, self.y + dy) for dx, dy in vertices])
+            [(x + dx, y + dy) for dx, dy in vertices])
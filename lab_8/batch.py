@@ -0,0 +1,162 @@
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from time import perf_counter
+import json
+import os
+import numpy as np
+
+from headless import HeadlessDriver
+from main import GameSession
+
+"""
+Runs many headless bot sessions on a process pool and stores their results column by column
+
+Usage:
+
+    python batch.py OUTPUT [--sessions N] [--seed SEED] [--score SCORE] [--max-ticks TICKS]
+        [--workers N] [--chunk N]
+
+OUTPUT is a directory with a raw little-endian array file per column and
+schema.json with their types, see read_results()
+
+Classes:
+
+    ColumnWriter
+
+Functions:
+
+    run_sessions(seeds, score, max_ticks)
+    run_batch(path, seeds, score, max_ticks, workers=None, chunk=CHUNK)
+    read_results(path)
+
+Constants:
+
+    COLUMNS, CAUSES, CHUNK
+
+"""
+
+# Column name -> NumPy type of the result columns
+COLUMNS = {"seed": "<i8", "score": "<i8", "ticks": "<i4", "cause": "u1"}
+# Causes of the session end, the cause column stores indices into this list
+CAUSES = ["timeout", GameSession.CRASHED, GameSession.FLOWN_OUT]
+# Sessions per task sent to a worker
+CHUNK = 16
+
+class ColumnWriter:
+    """ Appends rows to the column files, memory use does not depend on the number of rows """
+
+    def __init__(self, path):
+        """ Creates the output directory with empty columns
+        :param path: Path of the output directory
+        """
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, "schema.json"), "w") as file:
+            json.dump({"columns": COLUMNS, "causes": CAUSES}, file, indent=4)
+        self.files = {name: open(os.path.join(path, f"{name}.bin"), "wb") for name in COLUMNS}
+
+    def write(self, rows):
+        """ Appends rows
+        :param rows: List of tuples with values of COLUMNS in their order
+        """
+        for (name, dtype), values in zip(COLUMNS.items(), zip(*rows)):
+            np.array(values, dtype=dtype).tofile(self.files[name])
+
+    def close(self):
+        """ Flushes and closes the column files """
+        for file in self.files.values():
+            file.close()
+
+def read_results(path):
+    """
+    Reads results written by run_batch()
+    Rows not written to all of the columns, for example after a crash, are dropped
+
+    :param path: Path of the output directory
+    :returns: Dictionary column name -> NumPy array
+    """
+    with open(os.path.join(path, "schema.json")) as file:
+        schema = json.load(file)
+    columns = {name: np.fromfile(os.path.join(path, f"{name}.bin"), dtype=dtype)
+        for name, dtype in schema["columns"].items()}
+    rows = min(len(column) for column in columns.values())
+    return {name: column[:rows] for name, column in columns.items()}
+
+def run_sessions(seeds, score, max_ticks):
+    """
+    Plays headless sessions with the scripted bot, one per seed
+
+    :param seeds: List of session seeds
+    :param score: Initial score of every session
+    :param max_ticks: Sessions still alive after this number of ticks are stopped
+    :returns: List of rows (seed, score, ticks, cause), see COLUMNS
+    """
+    rows = []
+    for seed in seeds:
+        driver = HeadlessDriver(seed, score)
+        ticks = driver.run(max_ticks)
+        if driver.is_finished():
+            result, cause = driver.game_over.score, CAUSES.index(driver.game_over.death_message)
+        else:
+            result, cause = int(driver.session.score), 0
+        rows.append((seed, result, ticks, cause))
+    return rows
+
+def run_batch(path, seeds, score, max_ticks, workers=None, chunk=CHUNK):
+    """
+    Runs sessions on a process pool and streams their results into the output directory
+    Only a few chunks per worker are in flight, so memory stays flat for any number of sessions
+
+    :param path: Path of the output directory
+    :param seeds: Iterable of session seeds
+    :param score: Initial score of every session
+    :param max_ticks: Maximal length of a session in ticks
+    :param workers: (option) Number of worker processes, number of CPUs by default
+    :param chunk: (option) Number of sessions per task
+    :returns: Number of sessions run
+    """
+    workers = workers or os.cpu_count()
+    seeds = iter(seeds)
+    writer = ColumnWriter(path)
+    sessions = 0
+    with ProcessPoolExecutor(workers) as executor:
+        pending = set()
+        while True:
+            while len(pending) < 2 * workers:
+                chunk_seeds = [seed for _, seed in zip(range(chunk), seeds)]
+                if not chunk_seeds:
+                    break
+                pending.add(executor.submit(run_sessions, chunk_seeds, score, max_ticks))
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                rows = future.result()
+                writer.write(rows)
+                sessions += len(rows)
+    writer.close()
+    return sessions
+
+def main():
+    parser = ArgumentParser(description="Runs headless lab_8 bot sessions in parallel")
+    parser.add_argument("output", help="directory to write the result columns to")
+    parser.add_argument("--sessions", type=int, default=1000, help="number of sessions")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first session, next ones are consecutive")
+    parser.add_argument("--score", type=int, default=0, help="initial score of every session")
+    parser.add_argument("--max-ticks", type=int, default=10000, help="maximal length of a session in ticks")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes")
+    parser.add_argument("--chunk", type=int, default=CHUNK, help="sessions per task")
+    args = parser.parse_args()
+
+    start = perf_counter()
+    sessions = run_batch(args.output, range(args.seed, args.seed + args.sessions),
+        args.score, args.max_ticks, args.workers, args.chunk)
+    elapsed = perf_counter() - start
+
+    results = read_results(args.output)
+    print(f"{sessions} sessions in {elapsed:.1f}s, {sessions / elapsed:.1f} sessions/s")
+    print(f"mean score {results['score'].mean():.1f}, mean ticks {results['ticks'].mean():.1f}")
+    for i, count in enumerate(np.bincount(results["cause"], minlength=len(CAUSES))):
+        print(f"{CAUSES[i]}: {count}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+from argparse import ArgumentParser
+from time import perf_counter
+
+from headless import HeadlessDriver
+
+"""
+Measures simulation throughput of lab_8 without display
+
+Usage:
+
+    python benchmark.py [--seed SEED] [--ticks TICKS] [--levels SCORE ...]
+
+"""
+
+def benchmark_level(seed, score, ticks):
+    """ Runs headless sessions at the given score level
+    Sessions which end early are restarted with the next seed at the same level
+
+    :param seed: Seed of the first session
+    :param score: Initial score of every session
+    :param ticks: Total number of ticks to run
+    :returns: Dictionary with timings and object counts
+    """
+    timings = {}
+    result = {"deaths": 0, "peak_meteorites": 0, "peak_lasers": 0}
+    driver = HeadlessDriver(seed, score)
+    start = perf_counter()
+    for _ in range(ticks):
+        if driver.is_finished():
+            result["deaths"] += 1
+            driver = HeadlessDriver(seed + result["deaths"], score)
+        driver.step(timings)
+        result["peak_meteorites"] = max(result["peak_meteorites"], len(driver.session.meteorites))
+        result["peak_lasers"] = max(result["peak_lasers"], len(driver.session.lasers))
+    result["ticks_per_sec"] = ticks / (perf_counter() - start)
+    result["timings"] = timings
+    return result
+
+def main():
+    parser = ArgumentParser(description="Headless lab_8 simulation benchmark")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first session")
+    parser.add_argument("--ticks", type=int, default=1000, help="ticks per score level")
+    parser.add_argument("--levels", type=int, nargs="+", default=[0, 100, 1000, 10000],
+        help="initial scores to measure at")
+    args = parser.parse_args()
+
+    print(f"{'score':>8} {'ticks/s':>9} {'move':>8} {'spawn':>8} {'collide':>8} {'cleanup':>8}"
+        f" {'meteors':>8} {'lasers':>7} {'deaths':>7}")
+    for score in args.levels:
+        result = benchmark_level(args.seed, score, args.ticks)
+        # Mean phase times in microseconds per tick
+        phases = [result["timings"].get(name, 0) / args.ticks * 1e6
+            for name in ("move", "spawn", "collide", "cleanup")]
+        print(f"{score:>8} {result['ticks_per_sec']:>9.0f}"
+            + "".join(f" {t:>6.0f}us" for t in phases)
+            + f" {result['peak_meteorites']:>8} {result['peak_lasers']:>7} {result['deaths']:>7}")
+
+if __name__ == '__main__':
+    main()
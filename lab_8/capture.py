@@ -0,0 +1,84 @@
+from cProfile import Profile
+from threading import Thread
+from time import perf_counter, strftime
+import json
+
+"""
+Implements on-demand profiling of a stretch of the game
+
+Classes:
+
+    Capture
+
+"""
+
+class Capture:
+    """ Deterministic profile and timeline of the frame phases, started and stopped by the player
+
+    Phases are recorded through the same wrappers as the frame statistics, see wrap(),
+    the timeline is exported in the Chrome trace event format (chrome://tracing, Perfetto)
+    """
+
+    def __init__(self):
+        """ Starts profiling """
+        self.origin = perf_counter()
+        # Complete trace events (name, start, end), times in seconds from perf_counter()
+        self.events = []
+        self.profile = Profile()
+        self.profile.enable()
+
+    def mark(self, name, start, end):
+        """ Adds a phase to the timeline
+        :param name: Name of the phase
+        :param start: Start of the phase, perf_counter() value
+        :param end: End of the phase, perf_counter() value
+        """
+        self.events.append((name, start, end))
+
+    def wrap(self, phase, function):
+        """ Returns function which calls the given one and adds it to the timeline
+        :param phase: Name of the phase
+        :param function: Recorded function
+        """
+        events = self.events
+
+        def traced(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                events.append((phase, start, perf_counter()))
+
+        return traced
+
+    def stop(self, prefix=None):
+        """ Stops profiling and writes the results on a background thread:
+            * prefix.prof with the cProfile statistics, readable by pstats
+            * prefix.trace.json with the timeline
+        :param prefix: (option) Path of the files without extension, current time by default
+        :returns: Started writer thread
+        """
+        self.profile.disable()
+        if prefix is None:
+            prefix = strftime("profile-%Y%m%d-%H%M%S")
+        thread = Thread(target=self.write, args=(prefix,))
+        thread.start()
+        return thread
+
+    def trace(self):
+        """ :returns: Timeline as a Chrome trace object """
+        return {
+            "traceEvents": [
+                {"name": name, "ph": "X", "pid": 0, "tid": 0,
+                    "ts": (start - self.origin) * 1e6, "dur": (end - start) * 1e6}
+                for name, start, end in self.events
+            ],
+            "displayTimeUnit": "ms",
+        }
+
+    def write(self, prefix):
+        """ Writes the results, see stop() """
+        self.profile.dump_stats(f"{prefix}.prof")
+        with open(f"{prefix}.trace.json", "w") as file:
+            json.dump(self.trace(), file)
+        print(f"Profile is written to {prefix}.prof and {prefix}.trace.json")
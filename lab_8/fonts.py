@@ -0,0 +1,39 @@
+from functools import lru_cache
+import pygame
+
+"""
+Implements shared caches of fonts and rendered text
+
+Functions:
+
+    get_font(name, size)
+    render_text(name, size, text, color)
+
+Constants:
+
+    FONT_CACHE_SIZE, TEXT_CACHE_SIZE
+
+"""
+
+# Maximal number of cached entries, least recently used ones are evicted first
+FONT_CACHE_SIZE = 32
+TEXT_CACHE_SIZE = 256
+
+@lru_cache(maxsize=FONT_CACHE_SIZE)
+def get_font(name, size):
+    """ Returns font loaded from the file, each (name, size) pair is loaded only once
+    :param name: Font file name
+    :param size: Font size
+    """
+    return pygame.font.Font(name, size)
+
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
+def render_text(name, size, text, color):
+    """ Returns antialiased text surface, unchanged strings are not rendered again
+    :param name: Font file name
+    :param size: Font size
+    :param text: Text to be rendered
+    :param color: (R, G, B) text color
+    :returns: pygame.Surface shared between callers, it must not be modified
+    """
+    return get_font(name, size).render(text, True, color)
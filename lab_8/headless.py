@@ -0,0 +1,65 @@
+import pygame
+
+from locals import *
+import rng
+from inputs import ScriptedInput
+from main import GameSession
+
+"""
+Runs game sessions without display and user
+
+Classes:
+
+    HeadlessDriver
+
+"""
+
+class HeadlessDriver:
+    """ Drives GameSession with scripted input, stands in for Game
+
+    Death of the spaceship does not switch any state, the GameOver
+    is stored in game_over instead
+    """
+
+    def __init__(self, seed, score=0):
+        """ Initializes new session
+        :param seed: Seed of both the input stream and the game randomness
+        :param score: (option) Initial score, spawn rate grows with it
+        """
+        pygame.font.init()
+        rng.seed(seed)
+        self.inputs = ScriptedInput(seed, (WIDTH, HEIGHT))
+        self.session = GameSession(self.inputs)
+        self.session.game = self
+        self.session.score = score
+        self.game_over = None
+        self.ticks = 0
+
+    def switch_to(self, new_state):
+        """ Records the first state switch requested by the session """
+        if self.game_over is None:
+            self.game_over = new_state
+
+    def is_finished(self):
+        """ :returns: True if the spaceship is dead """
+        return self.game_over is not None
+
+    def step(self, timings=None):
+        """ Feeds scripted input into the session and progresses it by one tick
+        :param timings: (option) Dictionary phase name -> seconds, time of each phase is added to it
+        """
+        self.inputs.update(self.session.spaceship)
+        for event in self.inputs.events:
+            self.session.handle(event)
+
+        self.session.progress(timings)
+        self.ticks += 1
+
+    def run(self, max_ticks):
+        """ Progresses the session until the spaceship dies or max_ticks pass
+        :returns: Number of ticks run
+        """
+        start = self.ticks
+        while not self.is_finished() and self.ticks - start < max_ticks:
+            self.step()
+        return self.ticks - start
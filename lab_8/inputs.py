@@ -0,0 +1,115 @@
+from random import Random
+import pygame
+
+"""
+Implements sources of the polled user input
+
+Classes:
+
+    KeyState
+    FrameInput
+    ScriptedInput
+
+Constants:
+
+    frame_input
+
+"""
+
+class KeyState:
+    """ Set of pressed keys indexable like pygame.key.get_pressed() """
+
+    def __init__(self, pressed=()):
+        """ :param pressed: Iterable of pygame key constants which are held down """
+        self.pressed = set(pressed)
+
+    def __getitem__(self, key):
+        return key in self.pressed
+
+class FrameInput:
+    """ Mouse and keyboard state held fixed during a frame
+
+    main() captures it from pygame once per frame, replay sets it from a recording instead
+    """
+
+    def __init__(self):
+        self.mouse_pos = (0, 0)
+        self.keys = KeyState()
+
+    def get_mouse_pos(self):
+        """ :returns: Mouse position (x, y) of the current frame """
+        return self.mouse_pos
+
+    def get_pressed(self):
+        """ :returns: Pressed keys of the current frame """
+        return self.keys
+
+    def capture(self):
+        """ Reads mouse and keyboard state from pygame """
+        self.mouse_pos = pygame.mouse.get_pos()
+        self.keys = pygame.key.get_pressed()
+
+    def set(self, mouse_pos, keys):
+        """ Sets state of the frame
+        :param mouse_pos: Mouse position (x, y)
+        :param keys: Pressed keys, indexable by pygame key constants
+        """
+        self.mouse_pos = mouse_pos
+        self.keys = keys
+
+class ScriptedInput:
+    """ Seeded input stream of a simple bot, works without display
+
+    The bot hovers around the center of the screen, aims at random points
+    and fires the blaster periodically
+    """
+    AIM_PERIOD = 15
+    FIRE_PERIOD = 20
+    CHARGE_TICKS = 12
+
+    def __init__(self, seed, field_size):
+        """ Initializes the stream
+        :param seed: Seed of the input stream
+        :param field_size: List (width, height) of the play area
+        """
+        self.random = Random(seed)
+        self.width, self.height = field_size
+        self.tick = 0
+        self.mouse_pos = (self.width // 2, 0)
+        self.keys = KeyState()
+        self.events = []
+
+    def get_mouse_pos(self):
+        """ :returns: Scripted mouse position (x, y) """
+        return self.mouse_pos
+
+    def get_pressed(self):
+        """ :returns: Scripted pressed keys """
+        return self.keys
+
+    def update(self, spaceship):
+        """ Chooses input for the next tick
+        :param spaceship: Controlled Spaceship, the bot reacts to its position and velocity
+        """
+        self.tick += 1
+        if self.tick % ScriptedInput.AIM_PERIOD == 0:
+            self.mouse_pos = (self.random.randint(0, self.width), self.random.randint(0, self.height))
+
+        pressed = []
+        if spaceship.y > self.height / 2 or spaceship.v_y > 1:
+            pressed.append(pygame.K_w)
+        if spaceship.x < self.width / 3 or self.random.random() < 0.1:
+            pressed.append(pygame.K_d)
+        elif spaceship.x > self.width * 2 / 3 or self.random.random() < 0.1:
+            pressed.append(pygame.K_a)
+        self.keys = KeyState(pressed)
+
+        self.events = []
+        phase = self.tick % ScriptedInput.FIRE_PERIOD
+        if phase == 0:
+            self.events.append(pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=self.mouse_pos, button=1))
+        elif phase == ScriptedInput.CHARGE_TICKS:
+            self.events.append(pygame.event.Event(pygame.MOUSEBUTTONUP, pos=self.mouse_pos, button=1))
+
+# Polled input of the game, shared by the spaceship and the buttons
+frame_input = FrameInput()
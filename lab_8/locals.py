@@ -1,4 +1,5 @@
 from enum import Enum
+import pygame
 """
 Defines global scope constants
 
@@ -11,8 +12,14 @@ Functions:
 Constants:
 
     FPS
+    TICK_RATE, TICK_TIME, MAX_CATCH_UP_TICKS
+    DIRTY_RECTS, EXPOSE_EVENTS
+    CULL_MARGIN
     WIDTH, HEIGHT
     FONT_NAME, FONT_SIZE
+    METEORITE_SPRITES, SPRITE_CACHE_LIMIT
+    STATS_KEY, STATS_FONT_SIZE
+    PROFILE_KEY
 
 """
 
@@ -33,9 +40,35 @@ class Color:
 # Refresh rate
 FPS = 30
 
+# Simulation runs with fixed ticks, independently of the refresh rate
+TICK_RATE = 30
+TICK_TIME = 1 / TICK_RATE
+# Maximal number of ticks per frame, slower frames make the game slow down instead of stalling
+MAX_CATCH_UP_TICKS = 5
+
+# Only redraw screen areas touched during the current and the previous frame
+DIRTY_RECTS = True
+# Events after which the whole window has to be repainted
+EXPOSE_EVENTS = (pygame.WINDOWEXPOSED, pygame.VIDEOEXPOSE)
+
+# Objects further than this from the screen are removed from the game
+CULL_MARGIN = 100
+
 # Screen resolution
 WIDTH, HEIGHT = 1280, 720
 
 # Font
 FONT_NAME = "ShadowsIntoLight.ttf"
-FONT_SIZE = 50
\ No newline at end of file
+FONT_SIZE = 50
+
+# Meteorites are blitted from pre-rasterized sprites instead of drawn as polygons
+METEORITE_SPRITES = False
+# Memory limit of the meteorite sprite cache in bytes
+SPRITE_CACHE_LIMIT = 32 * 1024 * 1024
+
+# Key toggling frame timing statistics and their overlay
+STATS_KEY = pygame.K_F3
+STATS_FONT_SIZE = 24
+
+# Key starting and stopping profile capture, see capture.py
+PROFILE_KEY = pygame.K_F4
@@ -1,12 +1,20 @@
 from abc import ABC, abstractmethod
+import os
+from time import perf_counter
 from math import cos, sin, pi, atan2, log
+import numpy as np
 import pygame
 from pygame.draw import *
-from random import randint, uniform
+import rng
+from rng import randint, uniform
 
 from locals import *
-from model import Spaceship, Meteorite
+from model import Spaceship, Meteorite, MeteoriteField, Laser, compact, meteorite_pool, laser_pool
 from button import Button
+from fonts import get_font, render_text
+from sprites import SpriteCache
+from inputs import frame_input
+from frame_stats import FrameStats, StatsOverlay
 
 class GameState(ABC):
     """ Abstract class which derivatives are responsible for controlling all game elements:
@@ -14,13 +22,21 @@ class GameState(ABC):
         * Progression of the model and animation states
         * Rendering of the screen
     """
-    def __init__(self):
-        self.font = pygame.font.Font(FONT_NAME, FONT_SIZE)
+    # Active Capture the phases of progress() are added to, set by Game
+    capture = None
+
+    def render_text(self, text):
+        """ Returns text rendered with the default font, see fonts.render_text
+        :param text: Text to be rendered
+        """
+        return render_text(FONT_NAME, FONT_SIZE, text, Color.WHITE)
 
     @abstractmethod
-    def render(self):
+    def render(self, screen: pygame.Surface, alpha=1):
         """ Composes all visible objects
-        :returns: pygame.Surface with the result
+        :param screen: pygame.Surface to draw on, reused between frames
+        :param alpha: (option) Fraction of the simulation tick elapsed since the last progress()
+        :returns: List of pygame.Rect areas drawn this frame
         """
         pass
 
@@ -36,10 +52,18 @@ class GameState(ABC):
         """ Calculates new model and animation states """
         pass
 
+    def object_counts(self):
+        """ :returns: Dictionary object name -> number of objects, shown by the statistics overlay """
+        return {}
+
 class Game:
     """ Wrapper class which resposibility is to allow state switching """
+    PHASES = ("handle", "progress", "render")
+
     def __init__(self):
         """ Initializes the only memeber """
+        self.stats = None
+        self.capture = None
         self.switch_to(GameMenu())
 
     def switch_to(self, new_state):
@@ -49,22 +73,74 @@ class Game:
         self.state = new_state
         self.state.game = self
         
-        # Passes over function calls to state object
-        self.render = self.state.render
-        self.handle = self.state.handle
-        self.progress = self.state.progress
+        # Passes over function calls to state object, wrapped if they are timed
+        for name in Game.PHASES:
+            function = getattr(self.state, name)
+            for recorder in (self.stats, self.capture):
+                if recorder is not None:
+                    function = recorder.wrap(name, function)
+            setattr(self, name, function)
+        self.state.capture = self.capture
+
+    def set_stats(self, stats):
+        """ Starts or stops timing of the state functions
+        :param stats: FrameStats with Game.PHASES to add timings to, None stops timing
+        """
+        self.stats = stats
+        self.switch_to(self.state)
+
+    def preload(self):
+        """ Loads fonts the menu does not need yet, so they are ready before they are shown
+        :returns: Generator loading one more font on each step, main() steps it between frames
+        """
+        # Sizes of the animated buttons
+        for size in range(Button.FONTSIZE_SMALL, Button.FONTSIZE_BIG + 1):
+            yield get_font(FONT_NAME, size)
+        yield get_font(FONT_NAME, STATS_FONT_SIZE)
+
+    def set_capture(self, capture):
+        """ Starts or stops recording of the state functions into a profile capture
+        :param capture: Capture to add the phases to, None stops recording
+        """
+        self.capture = capture
+        self.switch_to(self.state)
 
 class GameSession(GameState):
     """ Game state representing actual game """
 
-    def __init__(self):
-        """ Initializes all game elements """
+    COUNTERS = (
+        "live_meteorites", "spawned_meteorites", "culled_meteorites",
+        "live_lasers", "spawned_lasers", "culled_lasers",
+    )
+
+    # Death messages
+    CRASHED = "You have crashed into a meteorite"
+    FLOWN_OUT = "You have flown out of screen"
+
+    def __init__(self, inputs=None):
+        """ Initializes all game elements
+        :param inputs: (option) Source of polled mouse and keyboard state, see inputs.py
+        """
         super().__init__()
-        self.spaceship = Spaceship(pos = (WIDTH / 2, HEIGHT / 2))
-        self.meteorites = []
+        self.spaceship = Spaceship(pos = (WIDTH / 2, HEIGHT / 2), inputs = inputs)
+        sprites = SpriteCache(SPRITE_CACHE_LIMIT) if METEORITE_SPRITES else None
+        self.meteorites = MeteoriteField((WIDTH, HEIGHT), sprites, CULL_MARGIN)
         self.score = 0
         self.lasers = []
 
+        # Object statistics of the last tick, see progress()
+        self.counters = dict.fromkeys(GameSession.COUNTERS, 0)
+        # Lasers fired since the last tick
+        self.fired = 0
+
+        # Named steps of progress(), in order of execution
+        self.phases = [
+            ("move", self.move_objects),
+            ("spawn", self.spawn_meteorites),
+            ("collide", self.check_crash),
+            ("cleanup", self.manage_laser_destruction),
+        ]
+
     def handle(self, event: pygame.event.Event):
         """ Handles all user input events
         :param event: pygame.event.Event to be handled
@@ -76,64 +152,100 @@ class GameSession(GameState):
             new_laser = self.spaceship.fire()
             if new_laser is not None:
                 self.lasers.append(new_laser)
+                self.fired += 1
 
-    def render(self):
+    def render(self, screen: pygame.Surface, alpha=1):
         """ Draws background, spaceships, meteoritesand, the score and the charge bar
-        :returns: pygame.Surface with the result
+        :param screen: pygame.Surface to draw on, reused between frames
+        :param alpha: (option) Fraction of the simulation tick elapsed since the last progress()
+        :returns: List of pygame.Rect areas drawn this frame
         """
-        screen = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-        self.spaceship.render(screen)
-        for meteorite in self.meteorites:
-            meteorite.render(screen)
+        dirty = [self.spaceship.render(screen, alpha)]
+        dirty += self.meteorites.render(screen, alpha)
 
         for laser in self.lasers:
-            laser.render(screen)
+            dirty.append(laser.render(screen, alpha))
 
-        text_surface = self.font.render(f"Your score: {int(self.score)}", True, Color.WHITE)
+        text_surface = self.render_text(f"Your score: {int(self.score)}")
         text_rect = text_surface.get_rect(topright = (WIDTH * 0.98, int(HEIGHT * 0.02)))
-        screen.blit(text_surface, text_rect)
+        dirty.append(screen.blit(text_surface, text_rect))
 
-        text_surface = self.font.render(f"Blaster charge: {self.spaceship.charge}%", True, Color.WHITE)
+        text_surface = self.render_text(f"Blaster charge: {self.spaceship.charge}%")
         text_rect = text_surface.get_rect(topleft = (WIDTH * 0.02, int(HEIGHT * 0.02)))
-        screen.blit(text_surface, text_rect)
+        dirty.append(screen.blit(text_surface, text_rect))
 
-        return screen
+        return dirty
     
     def manage_laser_destruction(self):
-        """ Deletes meteorites and lasers which have collided """
+        """ Deletes meteorites and lasers which have collided, and lasers which left the screen """
+        destroyed = np.zeros(len(self.meteorites), dtype=bool)
+        if self.lasers:
+            self.meteorites.update_grid()
         for laser in self.lasers:
-            for meteorite in self.meteorites:
-                if laser.is_hitting(meteorite):
-                    laser.alive = False
-                    meteorite.alive = False
+            if laser.is_outside_field((WIDTH, HEIGHT), CULL_MARGIN):
+                laser.alive = False
+                self.counters["culled_lasers"] += 1
+                continue
+            hit = self.meteorites.hit_indices((laser.x, laser.y), Laser.R)
+            if hit.size:
+                laser.alive = False
+                destroyed[hit] = True
         prev_num = len(self.meteorites)
-        self.meteorites[:] = [m for m in self.meteorites if m.alive]
-        self.lasers[:] = [m for m in self.lasers if m.alive]
+        if destroyed.any():
+            self.meteorites.remove(destroyed)
+        compact(self.lasers, laser_pool)
         new_num = len(self.meteorites)
         self.score += new_num - prev_num
 
-    def progress(self):
-        """ Calculates new model and animation states """
+    def move_objects(self):
+        """ Moves spaceship, meteorites and lasers """
         self.score += .1
         self.spaceship.move()
         self.spaceship.handle_keys()
-        for meteorite in self.meteorites:
-            meteorite.move()
-        new_meteorite_number = int(uniform(0, log(30 + self.score) / log(30)))
-        for _ in range(new_meteorite_number):
-            self.meteorites.append(Meteorite(x_range = (0, WIDTH), y_range = (0, 0)))
+        self.counters["culled_meteorites"] += self.meteorites.move()
 
         for laser in self.lasers:
             laser.move()
 
-        for meteorite in self.meteorites:
-            if self.spaceship.is_colliding(meteorite):
-                self.game.switch_to(GameOver("You have crashed into a meteorite", int(self.score)))
+    def spawn_meteorites(self):
+        """ Creates new meteorites, their number grows with the score """
+        new_meteorite_number = int(uniform(0, log(30 + self.score) / log(30)))
+        for _ in range(new_meteorite_number):
+            self.meteorites.add(meteorite_pool.acquire((0, WIDTH), (0, 0)))
+        self.counters["spawned_meteorites"] += new_meteorite_number
+
+    def check_crash(self):
+        """ Ends the game if spaceship has crashed or left the screen """
+        if self.spaceship.is_colliding_any(self.meteorites):
+            self.game.switch_to(GameOver(GameSession.CRASHED, int(self.score)))
 
         if self.spaceship.is_outside_field((WIDTH, HEIGHT)):
-            self.game.switch_to(GameOver("You have flown out of screen", int(self.score)))
+            self.game.switch_to(GameOver(GameSession.FLOWN_OUT, int(self.score)))
 
-        self.manage_laser_destruction()
+    def progress(self, timings=None):
+        """ Calculates new model and animation states, counts spawned, culled and live objects
+        :param timings: (option) Dictionary phase name -> seconds, time of each phase is added to it
+        """
+        self.counters = dict.fromkeys(GameSession.COUNTERS, 0)
+        self.counters["spawned_lasers"], self.fired = self.fired, 0
+        if timings is None and self.capture is None:
+            for _, phase in self.phases:
+                phase()
+        else:
+            for name, phase in self.phases:
+                start = perf_counter()
+                phase()
+                end = perf_counter()
+                if timings is not None:
+                    timings[name] = timings.get(name, 0) + end - start
+                if self.capture is not None:
+                    self.capture.mark(name, start, end)
+        self.counters["live_meteorites"] = len(self.meteorites)
+        self.counters["live_lasers"] = len(self.lasers)
+
+    def object_counts(self):
+        """ :returns: Object statistics of the last tick, see progress() """
+        return self.counters
 
 class GameMenu(GameState):
     """ Game state representing starting menu """
@@ -146,19 +258,20 @@ class GameMenu(GameState):
 
         self.buttons = [self.start_button, self.quit_button]
 
-    def render(self):
+    def render(self, screen: pygame.Surface, alpha=1):
         """ Displays game title and buttons
-        :returns: pygame.Surface with the result
+        :param screen: pygame.Surface to draw on, reused between frames
+        :param alpha: (option) Fraction of the simulation tick elapsed since the last progress()
+        :returns: List of pygame.Rect areas drawn this frame
         """
-        screen = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-        text_surface = self.font.render(f"<Abstract_Name>", True, Color.WHITE)
+        text_surface = self.render_text(f"<Abstract_Name>")
         text_rect = text_surface.get_rect(center = (WIDTH // 2, int(HEIGHT * 0.07)))
-        screen.blit(text_surface, text_rect)
+        dirty = [screen.blit(text_surface, text_rect)]
 
         for button in self.buttons:
-            button.render(screen)
+            dirty.append(button.render(screen))
 
-        return screen
+        return dirty
 
     def progress(self):
         """ Calculates new animation states """
@@ -187,27 +300,28 @@ class GameOver(GameState):
         self.death_message = death_message
         self.score = score
 
-    def render(self):
+    def render(self, screen: pygame.Surface, alpha=1):
         """ Displays the death cause message, the result and  the exit button
-        :returns: pygame.Surface with the result
+        :param screen: pygame.Surface to draw on, reused between frames
+        :param alpha: (option) Fraction of the simulation tick elapsed since the last progress()
+        :returns: List of pygame.Rect areas drawn this frame
         """
-        screen = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-        text_surface = self.font.render(f"Game Over", True, Color.WHITE)
+        text_surface = self.render_text(f"Game Over")
         text_rect = text_surface.get_rect(center = (WIDTH // 2, int(HEIGHT * 0.1)))
-        screen.blit(text_surface, text_rect)
+        dirty = [screen.blit(text_surface, text_rect)]
         
-        text_surface = self.font.render(self.death_message, True, Color.WHITE)
+        text_surface = self.render_text(self.death_message)
         text_rect = text_surface.get_rect(center = (WIDTH // 2, int(HEIGHT * 0.2)))
-        screen.blit(text_surface, text_rect)
+        dirty.append(screen.blit(text_surface, text_rect))
         
         if self.score:
-            text_surface = self.font.render(f"Your score is: {self.score}", True, Color.WHITE)
+            text_surface = self.render_text(f"Your score is: {self.score}")
             text_rect = text_surface.get_rect(center = (WIDTH // 2, int(HEIGHT * 0.3)))
-            screen.blit(text_surface, text_rect)
+            dirty.append(screen.blit(text_surface, text_rect))
 
-        self.menu_button.render(screen)
+        dirty.append(self.menu_button.render(screen))
 
-        return screen
+        return dirty
 
     def progress(self):
         """ Calculates new animation states """
@@ -223,35 +337,148 @@ class GameOver(GameState):
             self.game.switch_to(GameMenu())
 
 
-def main():
+def main(record=None, frames=None):
+    """ Runs the game
+    :param record: (option) Path of the file to record the session into, see recording.py
+    :param frames: (option) Number of frames to run, used by the startup benchmark
+    """
     pygame.init()
     pygame.font.init()
 
     screen = pygame.display.set_mode((WIDTH, HEIGHT))
 
+    recorder = None
+    if record is not None:
+        # Tools are imported only when used, they are not needed for the first frame
+        from secrets import randbits
+        from recording import Recorder
+        seed = randbits(63)
+        rng.seed(seed)
+        recorder = Recorder(record, seed)
+
     game = Game()
+    # Fonts of the other screens are loaded between frames
+    assets = game.preload()
+    frame = 0
     clock = pygame.time.Clock()
     finished = False
+    # Simulation time not yet consumed by fixed ticks, in seconds
+    accumulator = 0
+    # Areas drawn during the previous frame, they have to be cleared on the screen
+    previous_dirty = []
+    # The whole window is shown on the first frame and after it was covered
+    full_update = True
+    # Frame timings are collected only while the overlay is shown
+    stats = FrameStats(Game.PHASES)
+    overlay = StatsOverlay(FONT_NAME, STATS_FONT_SIZE, Color.WHITE, (WIDTH * 0.02, HEIGHT * 0.15))
 
     # Main cycle
     while not finished:
-        clock.tick(FPS)
+        accumulator += clock.tick(FPS) / 1000
+        frame_start = perf_counter()
         # Handles events
-        for event in pygame.event.get():
+        events = pygame.event.get()
+        frame_input.capture()
+        for event in events:
             if event.type == pygame.QUIT:
                 finished = True
+            elif event.type in EXPOSE_EVENTS:
+                full_update = True
+            elif event.type == pygame.KEYDOWN and event.key == STATS_KEY:
+                game.set_stats(stats if game.stats is None else None)
+            elif event.type == pygame.KEYDOWN and event.key == PROFILE_KEY:
+                if game.capture is None:
+                    from capture import Capture
+                    game.set_capture(Capture())
+                else:
+                    game.capture.stop()
+                    game.set_capture(None)
             else:
                 game.handle(event)
 
-        game.progress()
+        # Advances simulation by fixed ticks, dropping the backlog after a slow frame
+        ticks = 0
+        while accumulator >= TICK_TIME and ticks < MAX_CATCH_UP_TICKS:
+            game.progress()
+            accumulator -= TICK_TIME
+            ticks += 1
+        accumulator = min(accumulator, TICK_TIME)
 
-        # Renders game
-        screen.blit(game.render(), (0, 0))
+        if recorder is not None:
+            recorder.frame(ticks, frame_input, events)
+
+        # Renders game straight into the display surface
+        dirty = game.render(screen, accumulator / TICK_TIME)
+        if game.stats is not None:
+            dirty += overlay.render(screen, stats, game.state.object_counts())
 
         # Updates screen
-        pygame.display.update()
-        screen.fill(Color.BLACK)
+        if DIRTY_RECTS:
+            # Only areas drawn this or previous frame have changed
+            if full_update:
+                pygame.display.update()
+                full_update = False
+            else:
+                pygame.display.update(dirty + previous_dirty)
+            for rect in dirty:
+                screen.fill(Color.BLACK, rect)
+            previous_dirty = dirty
+        else:
+            pygame.display.update()
+            screen.fill(Color.BLACK)
+
+        if game.stats is not None:
+            stats.end_frame(perf_counter() - frame_start)
+        if game.capture is not None:
+            game.capture.mark("frame", frame_start, perf_counter())
+
+        frame += 1
+        if frame == frames:
+            finished = True
+        if not finished:
+            next(assets, None)
+    if game.capture is not None:
+        game.capture.stop()
+    if recorder is not None:
+        recorder.close()
     pygame.quit()
+    stats.dump()
+
+def replay(path):
+    """ Replays recorded session without rendering, as fast as possible
+    :param path: Path of the recording, see main()
+    :returns: Game in the state after the last recorded frame
+    """
+    # Events posted by the game need the video system, but no window is opened
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    pygame.init()
+
+    from recording import Recording
+    recording = Recording(path)
+    rng.seed(recording.seed)
+    game = Game()
+    for ticks, mouse_pos, pressed, events in recording:
+        frame_input.set(mouse_pos, pressed)
+        finished = False
+        for event in events:
+            if event.type == pygame.QUIT:
+                finished = True
+            else:
+                game.handle(event)
+        for _ in range(ticks):
+            game.progress()
+        if finished:
+            break
+    return game
 
 if __name__ == '__main__':
-    main()
+    from argparse import ArgumentParser
+    parser = ArgumentParser(description="Runs the game")
+    parser.add_argument("--record", metavar="PATH", help="record the session input into the file")
+    parser.add_argument("--replay", metavar="PATH", help="replay the recorded session without display")
+    args = parser.parse_args()
+    if args.replay is not None:
+        state = replay(args.replay).state
+        print(f"{type(state).__name__}, score {getattr(state, 'score', 0):.0f}")
+    else:
+        main(args.record)
@@ -1,21 +1,31 @@
 from math import cos, sin, pi, atan2
+import numpy as np
 import pygame
 from pygame.draw import *
 from locals import Color
-from random import randint, uniform
+from spatial import SpatialHash
+from inputs import frame_input
+from rng import RandomStream, randint, uniform
 
 """
 Implement game objects
 
 Classes:
 
+    Pool
     Spaceship
+    MeteoriteShape
+    ShapeLibrary
     Meteorite
+    MeteoriteField
     Laser
 
 Functions:
 
-    draw_polygon(screen, color, x, y, vertices_r, vertices_phi, phi_0=0)
+    polar_to_local(vertices_r, vertices_phi)
+    transform_vertices(local_vertices, x, y, phi)
+    interpolate(previous, current, alpha)
+    compact(objects, pool, keep=None)
     def dist2(p, q)
 
 """
@@ -33,26 +43,88 @@ def dist2(p, q):
     x2, y2 = q
     return (x1 - x2) ** 2 + (y1 - y2) ** 2
 
-def draw_polygon(screen, color, x, y, vertices_r, vertices_phi, phi_0=0):
-    """ Draw polygon with vertices given in polar coordinates
-    :param screen: pygame.Surface to draw polygon on
-    :param color: (R, G, B) color of polygon fill
-    :param x: X coordinate of polygon's center
-    :param y: Y coordinate of polygon's center
+def interpolate(previous, current, alpha):
+    """ Blends two consecutive states for rendering between simulation ticks
+    :param previous: Value (or NumPy array) at the previous tick
+    :param current: Value (or NumPy array) at the current tick
+    :param alpha: Fraction [0, 1] of the tick elapsed since the current state
+    """
+    return previous + (current - previous) * alpha
+
+def compact(objects, pool, keep=None):
+    """ Removes dead objects from the list in place, keeping the order of the others
+    :param objects: List of objects to be compacted
+    :param pool: Pool which receives the removed objects
+    :param keep: (option) Iterable of booleans, True for objects which stay, object.alive by default
+    """
+    if keep is None:
+        keep = [obj.alive for obj in objects]
+    j = 0
+    for obj, k in zip(objects, keep):
+        if k:
+            objects[j] = obj
+            j += 1
+        else:
+            pool.release(obj)
+    del objects[j:]
+
+def polar_to_local(vertices_r, vertices_phi):
+    """ Converts vertices given in polar coordinates into local Cartesian ones
     :param vertices_r: List of R coordinates of veritces
     :param vertices_phi: List of phi coordinates of vertices
-    :param phi_0: (option) Angle of the rotation of the whole polygon
+    :returns: Array of shape (n, 2) with (x, y) of vertices relative to the center
     """
-    vertices = [(r * cos(phi + phi_0), r * sin(phi + phi_0)) for r, phi in zip(vertices_r, vertices_phi)]
-    
-    polygon(screen,
-            color,
-            [(x + dx, y + dy) for dx, dy in vertices])
+    r = np.asarray(vertices_r, dtype=float)
+    phi = np.asarray(vertices_phi, dtype=float)
+    return np.column_stack((r * np.cos(phi), r * np.sin(phi)))
+
+def transform_vertices(local_vertices, x, y, phi):
+    """ Rotates local vertices by phi and moves them to (x, y)
+    Only one cos and one sin are calculated per call
+
+    :param local_vertices: Array of shape (n, 2) returned by polar_to_local
+    :param x: X coordinate of polygon's center
+    :param y: Y coordinate of polygon's center
+    :param phi: Angle of the rotation of the whole polygon
+    :returns: Array of shape (n, 2) with vertices coordinates
+    """
+    c, s = cos(phi), sin(phi)
+    local_x, local_y = local_vertices[:, 0], local_vertices[:, 1]
+    return np.column_stack((x + c * local_x - s * local_y, y + s * local_x + c * local_y))
+
+class Pool:
+    """ Free list of dead objects which are reinitialized instead of allocated anew
+
+    Pooled class must initialize itself in reset(*args), called by both __init__ and acquire
+    """
+    LIMIT = 4096
+
+    def __init__(self, cls):
+        """ :param cls: Class of pooled objects """
+        self.cls = cls
+        self.free = []
+
+    def acquire(self, *args):
+        """ Returns a dead object reset with given arguments, or a new one if there are none """
+        if not self.free:
+            return self.cls(*args)
+        obj = self.free.pop()
+        obj.reset(*args)
+        return obj
+
+    def release(self, obj):
+        """ Takes a dead object back, objects over the limit are left for the garbage collector """
+        if len(self.free) < Pool.LIMIT:
+            self.free.append(obj)
 
 class Spaceship:
     """ Represents a movable, controllable and drawable spaceship """ 
 
-    def __init__(self, pos=(0, 0)):
+    # Edges (a_u, a_v) -> (b_u, b_v) of the starship in scaled canonical basis, as column vectors
+    EDGES = (np.array([[1], [0], [0]]), np.array([[0], [1], [-1]]),
+        np.array([[0], [0], [1]]), np.array([[1], [-1], [0]]))
+
+    def __init__(self, pos=(0, 0), inputs=None):
         """ Initializes spaceship parameters:
             * Position (x, y)
             * Orientaion phi
@@ -61,17 +133,23 @@ class Spaceship:
             * Blaster percentage charge
             * Blaster status is_charging
         :param pos: List (x, y) of the initial coordinates
+        :param inputs: (option) Source of mouse and keyboard state, inputs.frame_input by default
         """
+        self.inputs = inputs if inputs is not None else frame_input
         self.x, self.y = pos
         self.phi = 0
+        self.prev_x, self.prev_y, self.prev_phi = self.x, self.y, self.phi
         self.v_x, self.v_y = 0, 0
         self.length = 60
         self.half_width = 25
+        self.local_vertices = polar_to_local(
+            [self.length, self.half_width, self.half_width], [0, pi / 2, -pi / 2])
         self.is_charging = False
         self.charge = 0
 
     def move(self):
         """ Calculates new coordinates and orientation, also charges blaster """
+        self.prev_x, self.prev_y, self.prev_phi = self.x, self.y, self.phi
         self.x += self.v_x
         self.y += self.v_y
 
@@ -83,7 +161,7 @@ class Spaceship:
         self.v_y *= 0.9
 
         # Turns spaceship towards mouse coursor
-        mouse_x, mouse_y = pygame.mouse.get_pos()
+        mouse_x, mouse_y = self.inputs.get_mouse_pos()
         self.phi = atan2(mouse_y - self.y, mouse_x -self.x)
 
         if self.is_charging:
@@ -102,13 +180,13 @@ class Spaceship:
         if self.charge > 15:
             charge = self.charge
             self.charge = 0
-            return Laser((self.x + self.length * cos(self.phi), self.y + self.length * sin(self.phi)), self.phi, charge)
+            return laser_pool.acquire((self.x + self.length * cos(self.phi), self.y + self.length * sin(self.phi)), self.phi, charge)
         else:
             return None
 
     def handle_keys(self):
         """ Listens for WASD keys and accelerates starship """
-        pressed = pygame.key.get_pressed()
+        pressed = self.inputs.get_pressed()
         if pressed[pygame.K_w] or pressed[pygame.K_UP]:
             self.v_y -= 1
         if pressed[pygame.K_s] or pressed[pygame.K_DOWN]:
@@ -118,14 +196,19 @@ class Spaceship:
         if pressed[pygame.K_d] or pressed[pygame.K_RIGHT]:
             self.v_x += 1
 
-    def render(self, screen: pygame.Surface):
+    def render(self, screen: pygame.Surface, alpha=1):
         """ Draws starship on the given surface
         :param screen: pygame.Surface to draw the spaceship on 
+        :param alpha: (option) Fraction of the tick elapsed, used to interpolate the position
+        :returns: pygame.Rect of the affected area
         """
-        vertices_r = [self.length, self.half_width, self.half_width]
-        vertices_phi = [0, pi / 2, -pi / 2]
-
-        draw_polygon(screen, Color.DEEP_BLUE, self.x, self.y, vertices_r, vertices_phi, self.phi)
+        # Orientation follows the mouse, so it is blended along the shortest arc
+        d_phi = (self.phi - self.prev_phi + pi) % (2 * pi) - pi
+        vertices = transform_vertices(self.local_vertices,
+            interpolate(self.prev_x, self.x, alpha),
+            interpolate(self.prev_y, self.y, alpha),
+            self.prev_phi + d_phi * alpha)
+        return polygon(screen, Color.DEEP_BLUE, vertices.tolist())
 
     def is_outside_field(self, screen_size):
         """ Checks if the starship is outside the game screen
@@ -136,41 +219,139 @@ class Spaceship:
         return (self.x < 0 or width < self.x
             or self.y < 0 or height < self.y)
 
-    def is_inside(self, point):
-        """ Checks if a given point is inside the starship
-        :param point: List (x, y) of point coordinates
-        :returns: True if the point is inside, False otherwise
-        """        
-        x, y = point
-        x -= self.x
-        y -= self.y
-        """ Get vector in canonical basis
-        (x axis towards farthest vertice, y alongside shortest side)
-        by rotation by -phi
-        """
-        x, y = cos(self.phi) * x + sin(self.phi) * y, -sin(self.phi) * x + cos(self.phi) * y
-
-        # Scales
-        x /= self.length
-        y /= self.half_width
-
-        # Triangle is an intersection of x > 0, x + y < 1 and x - y < 1
-        return x >= 0 and x + y <= 1 and x - y <= 1
-
     def is_colliding(self, meteorite):
         """ Checks if the starship is touching a meteorite
+        Bounding circles are compared first, then all meteorite vertices and edges
+        are tested against the starship triangle at once
+
         :param meteorite: Meteorite object to check collisions with
         :returns: True if spaceship is colliding, False otherwise
         """
-        vertices = [(r * cos(phi + meteorite.phi) + meteorite.x,
-            r * sin(phi + meteorite.phi) + meteorite.y) for r, phi in zip(meteorite.vert_r, meteorite.vert_phi)]
-        for v in vertices:
-            if self.is_inside(v):
-                return True
-        return False
+        reach = self.length + meteorite.radius
+        if dist2((self.x, self.y), (meteorite.x, meteorite.y)) > reach ** 2:
+            return False
+
+        vertices = transform_vertices(meteorite.local_vertices,
+            meteorite.x - self.x, meteorite.y - self.y, meteorite.phi)
+        dx, dy = vertices[:, 0], vertices[:, 1]
+        """ Get vertices in scaled canonical basis
+        (x axis towards farthest vertice, y alongside shortest side, scaled by length and half width),
+        where the starship is the triangle (1, 0), (0, 1), (0, -1)
+        """
+        c, s = cos(self.phi), sin(self.phi)
+        u = (c * dx + s * dy) / self.length
+        v = (-s * dx + c * dy) / self.half_width
+
+        # Meteorite vertex inside the starship
+        if ((u >= 0) & (u + v <= 1) & (u - v <= 1)).any():
+            return True
+
+        # Meteorite edge crossing one of the starship edges
+        u_next, v_next = np.roll(u, -1), np.roll(v, -1)
+        a_u, a_v, b_u, b_v = Spaceship.EDGES
+        d1 = (b_u - a_u) * (v - a_v) - (b_v - a_v) * (u - a_u)
+        d2 = (b_u - a_u) * (v_next - a_v) - (b_v - a_v) * (u_next - a_u)
+        d3 = (u_next - u) * (a_v - v) - (v_next - v) * (a_u - u)
+        d4 = (u_next - u) * (b_v - v) - (v_next - v) * (b_u - u)
+        if ((d1 * d2 < 0) & (d3 * d4 < 0)).any():
+            return True
+
+        # Starship entirely inside the meteorite: its nose is inside the polygon
+        crosses = (v > 0) != (v_next > 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            u_cross = u + (0 - v) * (u_next - u) / (v_next - v)
+        return bool(np.count_nonzero(crosses & (u_cross > 1)) % 2)
+
+    def is_colliding_any(self, field):
+        """ Checks if the starship is touching any meteorite of the field
+        Meteorites out of the bounding circle reach are rejected in one vectorized step
+
+        :param field: MeteoriteField to check collisions with
+        :returns: True if spaceship is colliding, False otherwise
+        """
+        n = len(field)
+        reach = self.length + Meteorite.R + Meteorite.D_R
+        d2 = (field.x[:n] - self.x) ** 2 + (field.y[:n] - self.y) ** 2
+        return any(self.is_colliding(field[i]) for i in np.nonzero(d2 <= reach ** 2)[0])
+
+class MeteoriteShape:
+    """ Random meteorite outline with data precomputed once and shared by all meteorites of this shape """
+
+    __slots__ = ("index", "vert_r", "vert_phi", "local_vertices", "radius", "area",
+        "sector", "edges", "edges_len2")
+
+    def __init__(self, index):
+        """ Generates random outline:
+            * Lists of vertices coordinates vert_r and vert_phi
+            * Cartesian table local_vertices
+            * Bounding radius
+            * Area
+        :param index: Index of the shape in the library
+        """
+        self.index = index
+        # Own stream per index, so the shape does not depend on the order shapes are generated in
+        stream = RandomStream((Meteorite.SHAPES_SEED, index), block=Meteorite.N + Meteorite.D_N + 1)
+        n = stream.randint(Meteorite.N - Meteorite.D_N, Meteorite.N + Meteorite.D_N)
+        self.vert_phi = [2 * pi / n * i for i in range(n)]
+        self.vert_r = [stream.randint(Meteorite.R - Meteorite.D_R, Meteorite.R + Meteorite.D_R) for _ in range(n)]
+        self.local_vertices = polar_to_local(self.vert_r, self.vert_phi)
+        self.radius = max(self.vert_r)
+
+        # Shoelace formula
+        x, y = self.local_vertices[:, 0], self.local_vertices[:, 1]
+        self.area = abs(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1))) / 2
+
+        # Edge i goes from vertex i to vertex i + 1
+        self.sector = 2 * pi / n
+        self.edges = np.roll(self.local_vertices, -1, axis=0) - self.local_vertices
+        self.edges_len2 = (self.edges ** 2).sum(axis=1)
+
+    def overlaps_circle(self, x, y, r):
+        """ Checks if the circle given in local coordinates touches the polygon
+        :param x: X coordinate of the circle center relative to the shape center, unrotated
+        :param y: Y coordinate of the circle center relative to the shape center, unrotated
+        :param r: Radius of the circle
+        :returns: True if the circle is inside or crosses the outline, False otherwise
+        """
+        """ Vertices are placed at equal angles around the center,
+        so the center is inside iff it is on the inner side of the edge of its sector
+        """
+        k = int((atan2(y, x) % (2 * pi)) // self.sector) % len(self.vert_r)
+        a_x, a_y = self.local_vertices[k]
+        e_x, e_y = self.edges[k]
+        if e_x * (y - a_y) - e_y * (x - a_x) >= 0:
+            return True
+
+        # Otherwise the circle has to reach one of the edges
+        d_x = x - self.local_vertices[:, 0]
+        d_y = y - self.local_vertices[:, 1]
+        t = np.clip((d_x * self.edges[:, 0] + d_y * self.edges[:, 1]) / self.edges_len2, 0, 1)
+        d2 = (d_x - t * self.edges[:, 0]) ** 2 + (d_y - t * self.edges[:, 1]) ** 2
+        return bool((d2 <= r ** 2).any())
+
+class ShapeLibrary:
+    """ Fixed size set of meteorite shapes, each one is generated on first use and memoized """
+
+    def __init__(self, size):
+        """ :param size: Number of different shapes """
+        self.shapes = [None] * size
+
+    def __len__(self):
+        return len(self.shapes)
+
+    def get(self, index):
+        """ Returns shape with the given index, generating it if needed """
+        shape = self.shapes[index]
+        if shape is None:
+            shape = self.shapes[index] = MeteoriteShape(index)
+        return shape
+
+    def pick(self):
+        """ Returns random shape """
+        return self.get(randint(0, len(self.shapes) - 1))
 
 class Meteorite:
-    """ Represents meteorite which can be moved and rendered """
+    """ Represents shape, color and spawn state of a meteorite, it is moved and rendered by MeteoriteField """
     MAX_V = 5
     MAX_V_PHI = 2 * pi / 30 * 0.5
 
@@ -180,14 +361,25 @@ class Meteorite:
 
     N, D_N = 15, 5
 
+    # Number of different shapes in the library
+    SHAPES = 64
+    # Seed of the shape outlines
+    SHAPES_SEED = 8
+
+    __slots__ = ("x", "y", "v_x", "v_y", "phi", "v_phi", "color",
+        "shape", "radius", "local_vertices", "alive")
+
     def __init__(self, x_range, y_range):
+        """ Initializes randomly metiorite parameters, see reset() """
+        self.reset(x_range, y_range)
+
+    def reset(self, x_range, y_range):
         """ Initializes randomly metiorite parameters:
             * Position (x, y)
             * Velocity (v_x, v_y)
             * Orientation phi
-            * Angular velocity v_phiif self.charge > 5:
-            self.charge = 
-            * Shape (Lists of vertices coordinates vert_r and vert_phi)
+            * Angular velocity v_phi
+            * Shape picked from the library (with its local_vertices and radius)
             * Color 
         :param x_range: List (x_min, x_max) of acceptable coordinates for the spawn
         :param y_range: List (y_min, y_max) of acceptable coordinates for the spawn  
@@ -198,32 +390,230 @@ class Meteorite:
         self.phi = 0
         self.v_phi = uniform(-Meteorite.MAX_V_PHI, Meteorite.MAX_V_PHI)
 
-        self.color = ([randint(*Meteorite.RGB_RANGE) for _ in range(3)])
-        self.n = randint(Meteorite.N - Meteorite.D_N, Meteorite.N + Meteorite.D_N)
-        self.vert_phi = [2 * pi / self.n * i for i in range(self.n)]
-        self.vert_r = [randint(Meteorite.R - Meteorite.D_R, Meteorite.R + Meteorite.D_R) for _ in range(self.n)]
+        self.color = (randint(*Meteorite.RGB_RANGE), randint(*Meteorite.RGB_RANGE), randint(*Meteorite.RGB_RANGE))
+        self.shape = shape_library.pick()
+        self.local_vertices = self.shape.local_vertices
+        self.radius = self.shape.radius
         
         self.alive = True
 
+    def overlaps_circle(self, d_x, d_y, phi, r):
+        """ Checks if the circle touches the meteorite outline
+        :param d_x: X coordinate of the circle center relative to the meteorite
+        :param d_y: Y coordinate of the circle center relative to the meteorite
+        :param phi: Current orientation of the meteorite
+        :param r: Radius of the circle
+        """
+        # Rotates the center by -phi into the local frame of the shape
+        c, s = cos(phi), sin(phi)
+        return self.shape.overlaps_circle(c * d_x + s * d_y, -s * d_x + c * d_y, r)
+
+class MeteoriteField:
+    """ Stores all meteorites as a structure of arrays and moves them in one vectorized step
+
+    Kinematic state (x, y, v_x, v_y, phi, v_phi) lives in contiguous NumPy arrays,
+    while shape and color stay in Meteorite objects kept in the same row order
+    """
+    GRAVITY = 0.1
+    INITIAL_CAPACITY = 64
+    # State arrays, prev_* keep the state of the previous tick for interpolation
+    ARRAYS = ("x", "y", "v_x", "v_y", "phi", "v_phi", "radius", "prev_x", "prev_y", "prev_phi")
+
+    def __init__(self, field_size, sprites=None, margin=None):
+        """ Initializes an empty field
+        :param field_size: List (width, height) of the play area, meteorites leaving it are culled
+        :param sprites: (option) SpriteCache, if given meteorites are blitted from it instead of drawn
+        :param margin: (option) Width of the band around the play area where meteorites are still kept,
+            the largest meteorite radius by default
+        """
+        self.width, self.height = field_size
+        self.margin = margin if margin is not None else Meteorite.R + Meteorite.D_R
+        self.sprites = sprites
+        self.meteorites = []
+        self.capacity = MeteoriteField.INITIAL_CAPACITY
+        for name in MeteoriteField.ARRAYS:
+            setattr(self, name, np.empty(self.capacity))
+        self.grid = SpatialHash(Meteorite.R + Meteorite.D_R + Laser.R)
+
+    def __len__(self):
+        return len(self.meteorites)
+
+    def __getitem__(self, i):
+        """ Returns i-th meteorite with the state copied from the arrays
+        :param i: Row index
+        """
+        meteorite = self.meteorites[i]
+        meteorite.x, meteorite.y = self.x[i], self.y[i]
+        meteorite.v_x, meteorite.v_y = self.v_x[i], self.v_y[i]
+        meteorite.phi, meteorite.v_phi = self.phi[i], self.v_phi[i]
+        return meteorite
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def grow(self):
+        """ Doubles capacity of the state arrays """
+        self.capacity *= 2
+        for name in MeteoriteField.ARRAYS:
+            old = getattr(self, name)
+            new = np.empty(self.capacity)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def add(self, meteorite):
+        """ Appends meteorite to the field
+        :param meteorite: Meteorite object, its current state is copied into the arrays
+        """
+        i = len(self)
+        if i == self.capacity:
+            self.grow()
+        self.x[i], self.y[i] = meteorite.x, meteorite.y
+        self.v_x[i], self.v_y[i] = meteorite.v_x, meteorite.v_y
+        self.phi[i], self.v_phi[i] = meteorite.phi, meteorite.v_phi
+        self.radius[i] = meteorite.radius
+        self.prev_x[i], self.prev_y[i], self.prev_phi[i] = meteorite.x, meteorite.y, meteorite.phi
+        self.meteorites.append(meteorite)
+
     def move(self):
-        """ Calculates new coordinates and orientation """
-        self.x += self.v_x
-        self.y += self.v_y
-        self.phi += self.v_phi
+        """ Calculates new coordinates and orientations of all meteorites, then culls ones that left the field
+        :returns: Number of culled meteorites
+        """
+        n = len(self)
+        self.prev_x[:n] = self.x[:n]
+        self.prev_y[:n] = self.y[:n]
+        self.prev_phi[:n] = self.phi[:n]
+        self.x[:n] += self.v_x[:n]
+        self.y[:n] += self.v_y[:n]
+        self.phi[:n] += self.v_phi[:n]
 
         # Apply gravity
-        self.v_y += 0.1
+        self.v_y[:n] += MeteoriteField.GRAVITY
+
+        return self.cull()
+
+    def cull(self):
+        """ Removes meteorites which left the play area expanded by the margin
+        Gravity only pulls down and there is no horizontal drag,
+        so such meteorites never come back
 
-    def render(self, screen: pygame.Surface):
-        """ Draws meteorite on the given surface
-        :param screen: pygame.Surface to draw the meteorite on 
+        :returns: Number of culled meteorites
         """
-        draw_polygon(screen, self.color, self.x, self.y, self.vert_r, self.vert_phi, self.phi)
+        n = len(self)
+        x, y = self.x[:n], self.y[:n]
+        outside = ((x < -self.margin) | (x > self.width + self.margin)
+            | (y < -self.margin) | (y > self.height + self.margin))
+        culled = int(np.count_nonzero(outside))
+        if culled:
+            self.remove(outside)
+        return culled
+
+    def remove(self, mask):
+        """ Removes meteorites and compacts arrays in place
+        :param mask: Boolean array of length len(self), True for meteorites to be removed
+        """
+        n = len(self)
+        keep = ~mask
+        m = int(keep.sum())
+        for name in MeteoriteField.ARRAYS:
+            array = getattr(self, name)
+            array[:m] = array[:n][keep]
+        compact(self.meteorites, meteorite_pool, keep.tolist())
+
+    def update_grid(self):
+        """ Rebuilds the spatial hash from current positions, call once per tick before hit queries """
+        n = len(self)
+        self.grid.rebuild(self.x[:n], self.y[:n])
+
+    def hit_indices(self, pos, r, exact=True):
+        """ Finds meteorites touched by the circle
+        Only meteorites from neighbouring grid cells are tested, bounding circles
+        reject most of them and the rest are (optionally) tested against their outlines
+
+        :param pos: List (x, y) of the circle center
+        :param r: Radius of the circle, together with meteorite radius must not exceed the grid cell size
+        :param exact: (option) False to stop at bounding circles
+        :returns: Array of row indices
+        """
+        candidates = self.grid.candidates(pos)
+        if not candidates.size:
+            return candidates
+        x, y = pos
+        d2 = (self.x[candidates] - x) ** 2 + (self.y[candidates] - y) ** 2
+        candidates = candidates[d2 <= (r + self.radius[candidates]) ** 2]
+        if not exact or not candidates.size:
+            return candidates
+        hits = [i for i in candidates.tolist()
+            if self.meteorites[i].overlaps_circle(x - self.x[i], y - self.y[i], self.phi[i], r)]
+        return np.array(hits, dtype=candidates.dtype)
+
+    def interpolated(self, alpha):
+        """ Returns arrays (x, y, phi) of the state blended between the last two ticks
+        :param alpha: Fraction of the tick elapsed since the last one
+        """
+        n = len(self)
+        if alpha == 1:
+            return self.x[:n], self.y[:n], self.phi[:n]
+        return (interpolate(self.prev_x[:n], self.x[:n], alpha),
+            interpolate(self.prev_y[:n], self.y[:n], alpha),
+            interpolate(self.prev_phi[:n], self.phi[:n], alpha))
+
+    def render(self, screen: pygame.Surface, alpha=1):
+        """ Draws all meteorites on the given surface
+        :param screen: pygame.Surface to draw meteorites on
+        :param alpha: (option) Fraction of the tick elapsed, used to interpolate positions
+        :returns: List of pygame.Rect areas affected
+        """
+        n = len(self)
+        if not n:
+            return []
+        if self.sprites is not None:
+            return self.render_sprites(screen, alpha)
+        x, y, phi = self.interpolated(alpha)
+        # All vertices are transformed at once, with one cos and one sin per meteorite
+        counts = [len(meteorite.local_vertices) for meteorite in self.meteorites]
+        local = np.concatenate([meteorite.local_vertices for meteorite in self.meteorites])
+        c = np.repeat(np.cos(phi), counts)
+        s = np.repeat(np.sin(phi), counts)
+        x = np.repeat(x, counts) + c * local[:, 0] - s * local[:, 1]
+        y = np.repeat(y, counts) + s * local[:, 0] + c * local[:, 1]
+        points = np.column_stack((x, y)).tolist()
+
+        rects = []
+        start = 0
+        for meteorite, count in zip(self.meteorites, counts):
+            rects.append(polygon(screen, meteorite.color, points[start:start + count]))
+            start += count
+        return rects
+
+    def render_sprites(self, screen: pygame.Surface, alpha=1):
+        """ Blits all meteorites from the sprite cache, using the nearest quantized orientation
+        Sprites are shared by meteorites of the same shape and tinted with their colors
+
+        :param screen: pygame.Surface to draw meteorites on
+        :param alpha: (option) Fraction of the tick elapsed, used to interpolate positions
+        :returns: List of pygame.Rect areas affected
+        """
+        x, y, phi = self.interpolated(alpha)
+        steps = self.sprites.step(phi).tolist()
+        x, y = x.tolist(), y.tolist()
+        rects = []
+        for i, meteorite in enumerate(self.meteorites):
+            sprite = self.sprites.get(meteorite.shape.index, steps[i], meteorite.local_vertices, meteorite.radius)
+            rects.append(self.sprites.blit(screen, sprite, meteorite.color, (x[i], y[i])))
+        return rects
 
 class Laser:
     """ Represents laser impulses which destroy meteorites on impact """
     R = 5
+
+    __slots__ = ("x", "y", "prev_x", "prev_y", "v_x", "v_y", "color", "alive")
+
     def __init__(self, pos, phi, charge):
+        """ Initializes Laser parameters, see reset() """
+        self.reset(pos, phi, charge)
+
+    def reset(self, pos, phi, charge):
         """ Initializes Laser parameters:
             * Position (x, y)
             * Velocity (v_x, v_y)
@@ -233,6 +623,7 @@ class Laser:
         :param charge: Charge percentage [0, 100] of the blaster
         """
         self.x, self.y = pos
+        self.prev_x, self.prev_y = self.x, self.y
         v = charge / 3
         self.v_x, self.v_y = v * cos(phi), v * sin(phi)
 
@@ -241,21 +632,38 @@ class Laser:
 
     def move(self):
         """ Calculates new coordinates and orientation """
+        self.prev_x, self.prev_y = self.x, self.y
         self.x += self.v_x
         self.y += self.v_y
 
         # Apply gravity
         self.v_y += 0.25
 
-    def render(self, screen: pygame.Surface):
+    def render(self, screen: pygame.Surface, alpha=1):
         """ Draws laser on the given surface
         :param screen: pygame.Surface to draw the laser on 
+        :param alpha: (option) Fraction of the tick elapsed, used to interpolate the position
+        :returns: pygame.Rect of the affected area
         """
-        circle(screen, self.color, (self.x, self.y), Laser.R)
-    
-    def is_hitting(self, meteorite):
-        """ Checks if the laser is touching meteorite
-        :param meteorite: Meteorite to check collision with
-        :returns: True if is hitting, False otherwise
+        pos = (interpolate(self.prev_x, self.x, alpha), interpolate(self.prev_y, self.y, alpha))
+        return circle(screen, self.color, pos, Laser.R)
+
+    def is_outside_field(self, screen_size, margin=0):
+        """ Checks if the laser has left the game screen expanded by the margin and can not come back
+        Lasers start on the screen and there is no horizontal drag, so they never return
+        through the sides, and gravity only accelerates them once they fall below the bottom.
+        Shots above the top always fall back, so they are kept
+
+        :param screen_size: List (width, height)
+        :param margin: (option) Width of the band around the screen which is still inside
+        :returns: True if laser is outside, False otherwise
         """
-        return (Laser.R + meteorite.R) ** 2 >= dist2((self.x, self.y), (meteorite.x, meteorite.y))
\ No newline at end of file
+        width, height = screen_size
+        return self.x < -margin or width + margin < self.x or height + margin < self.y
+
+# Shapes shared by all meteorites
+shape_library = ShapeLibrary(Meteorite.SHAPES)
+
+# Dead objects waiting for reuse
+meteorite_pool = Pool(Meteorite)
+laser_pool = Pool(Laser)
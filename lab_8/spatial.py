@@ -0,0 +1,58 @@
+import numpy as np
+
+"""
+Implements broad-phase collision helpers
+
+Classes:
+
+    SpatialHash
+
+"""
+
+class SpatialHash:
+    """ Uniform grid over points given as coordinate arrays
+
+    Points are bucketed by cell and sorted by cell key, so a query
+    only looks at the 3x3 block of cells around the requested position
+    """
+    # Shifts cell coordinates to non-negative values before packing them into one key
+    OFFSET = 1 << 20
+    STRIDE = 1 << 21
+
+    def __init__(self, cell_size):
+        """ Initializes an empty grid
+        :param cell_size: Side of a grid cell, must be not less than any queried distance
+        """
+        self.cell_size = cell_size
+        self.keys = np.empty(0, dtype=np.int64)
+        self.order = np.empty(0, dtype=np.intp)
+
+    def key(self, cx, cy):
+        """ Packs cell coordinates into one integer key """
+        return (cx + SpatialHash.OFFSET) * SpatialHash.STRIDE + (cy + SpatialHash.OFFSET)
+
+    def rebuild(self, x, y):
+        """ Buckets all points into grid cells
+        :param x: Array of X coordinates
+        :param y: Array of Y coordinates
+        """
+        cx = np.floor_divide(x, self.cell_size).astype(np.int64)
+        cy = np.floor_divide(y, self.cell_size).astype(np.int64)
+        keys = self.key(cx, cy)
+        self.order = np.argsort(keys, kind="stable")
+        self.keys = keys[self.order]
+
+    def candidates(self, pos):
+        """ Finds points in the cell containing pos and in its 8 neighbours
+        :param pos: List (x, y) of query coordinates
+        :returns: Array of indices of points passed to the last rebuild
+        """
+        x, y = pos
+        cx, cy = int(x // self.cell_size), int(y // self.cell_size)
+        # Neighbouring cells in one column have consecutive keys
+        columns = self.key(np.arange(cx - 1, cx + 2, dtype=np.int64), cy)
+        starts = np.searchsorted(self.keys, columns - 1)
+        ends = np.searchsorted(self.keys, columns + 1, side="right")
+        if not (ends - starts).any():
+            return self.order[:0]
+        return np.concatenate([self.order[s:e] for s, e in zip(starts, ends)])
@@ -0,0 +1,112 @@
+from collections import OrderedDict
+from math import cos, sin, pi
+import pygame
+from pygame.draw import polygon
+
+"""
+Implements caching of pre-rasterized rotated shapes
+
+Classes:
+
+    SpriteCache
+
+"""
+
+class SpriteCache:
+    """ LRU cache of shapes rasterized at a fixed set of quantized angles
+
+    Every shape has one 8-bit atlas with a cell per angle, shared by all objects of the shape,
+    the color is set through the atlas palette right before the blit, see blit().
+    Changing the palette makes SDL rebuild the blit mapping of the surface, which is cheap
+    for a few surfaces but slows down with every other surface blitted to the same screen,
+    so angles are cells of one surface rather than separate surfaces.
+    Cells are rasterized on first use, atlases are evicted, least recently used first,
+    once their total size exceeds the memory limit
+    """
+    ANGLE_STEPS = 64
+    # Palette index of the shape pixels, index 0 is the transparent background
+    FILL = 1
+
+    def __init__(self, limit):
+        """ Initializes an empty cache
+        :param limit: Maximal total size of cached surfaces in bytes
+        """
+        self.limit = limit
+        self.size = 0
+        # Key -> (atlas, list of flags whether the angle cell is rasterized)
+        self.atlases = OrderedDict()
+
+    def __len__(self):
+        """ Returns number of rasterized sprites """
+        return sum(sum(rasterized) for _, rasterized in self.atlases.values())
+
+    def step(self, phi):
+        """ Returns indices of the quantized angles nearest to phi
+        :param phi: NumPy array of angles
+        """
+        return (phi * (SpriteCache.ANGLE_STEPS / (2 * pi))).round().astype(int) % SpriteCache.ANGLE_STEPS
+
+    def get(self, key, step, local_vertices, radius):
+        """ Returns mask of the shape rotated by the given quantized angle
+        :param key: Hashable identifier of the shape
+        :param step: Index of the quantized angle, see step()
+        :param local_vertices: Array of shape (n, 2) with local vertices of the shape
+        :param radius: Bounding radius of the shape
+        :returns: Tuple (atlas, area), 8-bit pygame.Surface and pygame.Rect of the cell
+            with the shape centered in it
+        """
+        entry = self.atlases.get(key)
+        if entry is None:
+            entry = self.atlases[key] = self.allocate(radius)
+            atlas = entry[0]
+            self.size += atlas.get_width() * atlas.get_height() * atlas.get_bytesize()
+            while self.size > self.limit and len(self.atlases) > 1:
+                _, (evicted, _) = self.atlases.popitem(last=False)
+                self.size -= evicted.get_width() * evicted.get_height() * evicted.get_bytesize()
+        else:
+            self.atlases.move_to_end(key)
+
+        atlas, rasterized = entry
+        side = atlas.get_width()
+        area = pygame.Rect(0, step * side, side, side)
+        if not rasterized[step]:
+            self.rasterize(atlas, area, step, local_vertices)
+            rasterized[step] = True
+        return atlas, area
+
+    def blit(self, screen, sprite, color, center):
+        """ Draws the mask filled with the given color
+        :param screen: pygame.Surface to draw on
+        :param sprite: Tuple (atlas, area) returned by get()
+        :param color: (R, G, B) color of the shape
+        :param center: Position (x, y) of the shape center
+        :returns: pygame.Rect of the affected area
+        """
+        atlas, area = sprite
+        atlas.set_palette_at(SpriteCache.FILL, color)
+        half = area.width // 2
+        return screen.blit(atlas, (center[0] - half, center[1] - half), area)
+
+    def allocate(self, radius):
+        """ Creates an empty atlas for a shape with the given bounding radius
+        :returns: Tuple (atlas, rasterized flags), see get()
+        """
+        side = 2 * (int(radius) + 1)
+        atlas = pygame.Surface((side, side * SpriteCache.ANGLE_STEPS), 0, 8)
+        atlas.set_colorkey(0)
+        return atlas, [False] * SpriteCache.ANGLE_STEPS
+
+    def rasterize(self, atlas, area, step, local_vertices):
+        """ Draws the shape rotated by the quantized angle into its atlas cell
+        :param atlas: 8-bit pygame.Surface of the shape
+        :param area: pygame.Rect of the cell
+        :param step: Index of the quantized angle
+        :param local_vertices: Array of shape (n, 2) with local vertices of the shape
+        """
+        x_0, y_0 = area.center
+        phi = 2 * pi * step / SpriteCache.ANGLE_STEPS
+        c, s = cos(phi), sin(phi)
+        vertices = [(x_0 + c * x - s * y, y_0 + s * x + c * y) for x, y in local_vertices]
+        atlas.set_clip(area)
+        polygon(atlas, SpriteCache.FILL, vertices)
+        atlas.set_clip(None)